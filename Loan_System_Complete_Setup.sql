@@ -10,6 +10,9 @@
 -- Step 1: Drop Existing Objects (if any)
 -- =====================================================
 
+DROP TABLE IF EXISTS reference_versions CASCADE;
+DROP TABLE IF EXISTS matview_refreshes CASCADE;
+DROP MATERIALIZED VIEW IF EXISTS v_borrower_portfolio CASCADE;
 DROP TABLE IF EXISTS audit_logs CASCADE;
 DROP TABLE IF EXISTS receipts CASCADE;
 DROP TABLE IF EXISTS repayments CASCADE;
@@ -88,6 +91,9 @@ CREATE TABLE loans (
     disbursed_on TIMESTAMP WITH TIME ZONE,
     status loan_status_enum NOT NULL DEFAULT 'pending',
     outstanding NUMERIC(12, 2),
+    version INTEGER NOT NULL DEFAULT 1,
+    schedule_mode VARCHAR(16) NOT NULL DEFAULT 'full',
+    installments_materialized INTEGER,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (borrower_id) REFERENCES borrowers(id) ON DELETE CASCADE,
     FOREIGN KEY (loan_type_id) REFERENCES loan_types(id) ON DELETE SET NULL
@@ -114,15 +120,19 @@ CREATE INDEX idx_collateral_type ON collateral(type);
 
 -- TABLE: ledger
 -- Purpose: Financial ledger entries for loans
+-- Range-partitioned by month on date; run `python -m app.partitions ensure`
+-- to create the monthly partitions (rows land in ledger_default until then)
 CREATE TABLE ledger (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     loan_id INTEGER NOT NULL,
     type VARCHAR(32) NOT NULL,
     amount NUMERIC(12, 2) NOT NULL,
-    date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     balance_after NUMERIC(12, 2),
+    PRIMARY KEY (id, date),
     FOREIGN KEY (loan_id) REFERENCES loans(id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (date);
+CREATE TABLE ledger_default PARTITION OF ledger DEFAULT;
 
 CREATE INDEX idx_ledger_loan_id ON ledger(loan_id);
 CREATE INDEX idx_ledger_type ON ledger(type);
@@ -156,17 +166,21 @@ CREATE TABLE receipts (
 );
 
 CREATE INDEX idx_receipts_receipt_number ON receipts(receipt_number);
+CREATE INDEX idx_receipts_created_at ON receipts(created_at, id);
 
 -- TABLE: audit_logs
 -- Purpose: Complete audit trail of system actions
+-- Range-partitioned by month on timestamp, like ledger
 CREATE TABLE audit_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id INTEGER,
     action VARCHAR(64) NOT NULL,
     details TEXT,
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
-);
+) PARTITION BY RANGE (timestamp);
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
 
 CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id);
 CREATE INDEX idx_audit_logs_timestamp ON audit_logs(timestamp);
@@ -252,10 +266,17 @@ COMMENT ON COLUMN audit_logs.timestamp IS 'When action was performed';
 -- Composite index for finding all active loans by borrower
 CREATE INDEX idx_loans_borrower_status ON loans(borrower_id, status);
 
+-- Composite index for keyset pagination of the loan listing
+CREATE INDEX idx_loans_created_at_id ON loans(created_at, id);
+
 -- Index for finding overdue repayments efficiently
 CREATE INDEX idx_repayments_overdue ON repayments(status, due_date) 
 WHERE status IN ('due', 'overdue');
 
+-- Overdue queue in (due_date, id) order, so each keyset page is a range scan
+CREATE INDEX idx_repayments_overdue_queue ON repayments(due_date, id)
+WHERE status IN ('due', 'overdue');
+
 -- Index for collateral submission date queries
 CREATE INDEX idx_collateral_submitted_on ON collateral(submitted_on);
 
@@ -266,9 +287,65 @@ CREATE INDEX idx_ledger_loan_date ON ledger(loan_id, date);
 CREATE INDEX idx_loans_active_outstanding ON loans(outstanding) 
 WHERE status = 'active' AND outstanding > 0;
 
+-- Windowed repayment schedules the API's scheduler still has to extend
+CREATE INDEX idx_loans_schedule_window ON loans(id)
+WHERE schedule_mode = 'windowed' AND installments_materialized < term_months;
+
 -- Index for borrower credit score analysis
 CREATE INDEX idx_borrowers_credit_monthly ON borrowers(credit_score, monthly_income);
 
+-- Borrower search: trigram index for fuzzy name matches, and a byte-ordered
+-- lower(name) index for prefix autocomplete with (name, id) keyset paging
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_borrowers_name_trgm ON borrowers USING gin (name gin_trgm_ops);
+CREATE INDEX idx_borrowers_name_prefix ON borrowers ((lower(name) COLLATE "C"), id);
+
+-- Borrower portfolio totals, refreshed CONCURRENTLY by the API's scheduler
+-- (needs the unique index); each refresh is stamped in matview_refreshes
+CREATE MATERIALIZED VIEW v_borrower_portfolio AS
+SELECT
+    b.id AS borrower_id,
+    b.name AS borrower_name,
+    b.credit_score,
+    COUNT(l.id) AS total_loans_count,
+    COUNT(l.id) FILTER (WHERE l.status = 'active') AS active_loans_count,
+    COALESCE(SUM(l.principal), 0) AS total_principal_disbursed,
+    COALESCE(SUM(l.outstanding), 0) AS total_outstanding_amount,
+    COALESCE(SUM(l.principal - l.outstanding), 0) AS total_repaid_principal,
+    COALESCE(SUM(COALESCE(l.outstanding, l.principal))
+             FILTER (WHERE l.status IN ('approved', 'active')), 0) AS exposure
+FROM borrowers b
+LEFT JOIN loans l ON l.borrower_id = b.id
+GROUP BY b.id, b.name, b.credit_score
+WITH NO DATA;
+CREATE UNIQUE INDEX idx_v_borrower_portfolio_borrower ON v_borrower_portfolio (borrower_id);
+CREATE INDEX idx_v_borrower_portfolio_exposure ON v_borrower_portfolio (exposure, borrower_id);
+CREATE INDEX idx_v_borrower_portfolio_outstanding ON v_borrower_portfolio (total_outstanding_amount, borrower_id);
+
+CREATE TABLE matview_refreshes (
+    view_name VARCHAR(64) PRIMARY KEY,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Reference data versions: any write to loan_types bumps its version so the
+-- API's in-process loan type cache reloads
+CREATE TABLE reference_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+INSERT INTO reference_versions (name, version) VALUES ('loan_types', 1);
+
+CREATE OR REPLACE FUNCTION bump_reference_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE reference_versions SET version = version + 1 WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_loan_types_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON loan_types
+FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_version('loan_types');
+
 -- =====================================================
 -- Step 6: Insert Sample Data (Optional)
 -- =====================================================
@@ -326,6 +403,11 @@ INSERT INTO audit_logs (user_id, action, details) VALUES
 (2, 'LOAN_APPROVED', 'Loan ID 4 approved by officer - Personal loan for Neha Sharma'),
 (3, 'REPAYMENT_RECORDED', 'Payment of 4167 received for repayment ID 1');
 
+-- Populate the portfolio view (keep this even without the sample data;
+-- concurrent refreshes need a populated view)
+REFRESH MATERIALIZED VIEW v_borrower_portfolio;
+INSERT INTO matview_refreshes (view_name, refreshed_at) VALUES ('v_borrower_portfolio', now());
+
 -- =====================================================
 -- Step 7: Verify Schema
 -- =====================================================
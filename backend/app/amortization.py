@@ -0,0 +1,144 @@
+# app/amortization.py
+"""Vectorized EMI amortization engine.
+
+All money is handled as int64 cents and annual rates as int64 units of
+1/10000 of a percent, so per-installment interest is an exact integer
+division rounded half-up (the same rule the old Decimal loop used). Many
+loans are amortized at once: the month loop runs at most max(term) times
+and each step is one array operation across every loan.
+
+The EMI itself needs a fractional power and is computed in float64 before
+being rounded to cents; the final installment absorbs any residual, so a
+schedule always repays the principal exactly. Rates are read as decimals
+(via str), where the old loop used Decimal(float); for a rate with no
+exact binary form the per-month interest can round differently, and the
+final installment then differs from the old loop's.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+RATE_SCALE = 10_000  # 12.5% -> 125_000 rate units
+_MONTHLY_DIVISOR = 12 * 100 * RATE_SCALE
+
+# Inputs the int64 arithmetic is safe for. loans.principal is Numeric(12,2);
+# at the caps, balance * rate units is 1e18, well inside int64
+MAX_PRINCIPAL = Decimal("9999999999.99")
+MAX_ANNUAL_RATE = 100
+MAX_TERM_MONTHS = 600
+
+
+class Schedule(NamedTuple):
+    """Per-loan schedules padded to the longest term (rows = loans)."""
+
+    terms: np.ndarray  # (loans,)
+    emi: np.ndarray  # (loans,)
+    payment: np.ndarray  # (loans, max_term); 0 past a loan's term
+    interest: np.ndarray
+    principal: np.ndarray
+    balance: np.ndarray  # balance after each installment
+
+    def installments(self, k: int):
+        """(number, payment, interest, principal, balance_after) as Decimal for loan k."""
+        for i in range(int(self.terms[k])):
+            yield (
+                i + 1,
+                cents_to_decimal(self.payment[k, i]),
+                cents_to_decimal(self.interest[k, i]),
+                cents_to_decimal(self.principal[k, i]),
+                cents_to_decimal(self.balance[k, i]),
+            )
+
+
+def to_cents(amounts) -> np.ndarray:
+    # Go through str so Decimal("1234.565") is not first turned into a float
+    return np.array(
+        [int((Decimal(str(a)) * 100).to_integral_value()) for a in amounts],
+        dtype=np.int64,
+    )
+
+
+def to_rate_units(annual_rates) -> np.ndarray:
+    return np.array(
+        [int((Decimal(str(r)) * RATE_SCALE).to_integral_value()) for r in annual_rates],
+        dtype=np.int64,
+    )
+
+
+def cents_to_decimal(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _div_half_up(num: np.ndarray, den) -> np.ndarray:
+    # Non-negative integer division rounded half-up
+    return (2 * num + den) // (2 * den)
+
+
+def monthly_emi(principal_cents, rate_units, terms) -> np.ndarray:
+    P = np.asarray(principal_cents, dtype=np.int64)
+    units = np.asarray(rate_units, dtype=np.int64)
+    n = np.asarray(terms, dtype=np.int64)
+
+    r = units.astype(np.float64) / _MONTHLY_DIVISOR
+    growth = np.power(1.0 + r, n.astype(np.float64))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortized = np.nan_to_num(P * r * growth / (growth - 1.0))
+    amortized = np.floor(amortized + 0.5).astype(np.int64, copy=False)
+    flat = _div_half_up(P, np.maximum(n, 1))
+    return np.where(units == 0, flat, amortized)
+
+
+def check_bounds(principal, annual_rate, term_months):
+    """Raise ValueError unless the loan fits the engine's int64 range."""
+    principal, annual_rate = Decimal(str(principal)), Decimal(str(annual_rate))
+    if not principal.is_finite() or not 0 < principal <= MAX_PRINCIPAL:
+        raise ValueError(f"principal must be > 0 and <= {MAX_PRINCIPAL}")
+    if not annual_rate.is_finite() or not 0 <= annual_rate <= MAX_ANNUAL_RATE:
+        raise ValueError(f"interest_rate must be between 0 and {MAX_ANNUAL_RATE}")
+    if not 1 <= term_months <= MAX_TERM_MONTHS:
+        raise ValueError(f"term_months must be between 1 and {MAX_TERM_MONTHS}")
+
+
+def amortize(principals, annual_rates, terms) -> Schedule:
+    """Amortize a batch of loans given as parallel sequences."""
+    principals, annual_rates, terms = list(principals), list(annual_rates), list(terms)
+    for p, r, n in zip(principals, annual_rates, terms):
+        check_bounds(p, r, n)
+    P = to_cents(principals)
+    units = to_rate_units(annual_rates)
+    n = np.asarray(terms, dtype=np.int64)
+    emi = monthly_emi(P, units, n)
+
+    loans = len(P)
+    width = int(n.max()) if loans else 0
+    payment = np.zeros((loans, width), dtype=np.int64)
+    interest = np.zeros((loans, width), dtype=np.int64)
+    principal = np.zeros((loans, width), dtype=np.int64)
+    balance_after = np.zeros((loans, width), dtype=np.int64)
+
+    balance = P.copy()
+    for i in range(width):
+        live = n > i
+        last = n == i + 1
+        it = _div_half_up(balance * units, _MONTHLY_DIVISOR)
+        pc = np.where(last, balance, emi - it)
+        # A rounded-up EMI can repay a tiny principal early (0.05 over 10
+        # months at 0% is 0.01 a month); never take more than is left, so
+        # no installment, the last included, goes negative
+        pc = np.where(live, np.clip(pc, 0, balance), 0)
+        it = np.where(live, it, 0)
+        interest[:, i] = it
+        principal[:, i] = pc
+        payment[:, i] = pc + it
+        balance = balance - pc
+        balance_after[:, i] = np.where(live, balance, 0)
+
+    return Schedule(n, emi, payment, interest, principal, balance_after)
+
+
+def due_dates(start: datetime, term_months: int):
+    # Offsets are taken from start, so a 31st does not drift to the 28th
+    return [start + relativedelta(months=i) for i in range(1, term_months + 1)]
@@ -0,0 +1,172 @@
+# app/audit.py
+# Buffered audit-log writer.
+#
+# record() only timestamps the event and puts it on a bounded in-memory
+# queue, so request handlers (sync or async) never wait on the database.
+# A background thread drains the queue and batch-inserts into audit_logs
+# every AUDIT_FLUSH_INTERVAL_MS or AUDIT_BATCH_SIZE rows, whichever comes
+# first. When the queue is full, AUDIT_OVERFLOW=block waits up to
+# AUDIT_BLOCK_TIMEOUT_MS for room (backpressure) before dropping the event;
+# AUDIT_OVERFLOW=drop drops it straight away. Calls made on the event loop
+# (async handlers) never wait, whatever the policy. Dropped and failed rows
+# are counted and logged. The lifespan stops the writer, which flushes
+# whatever is still queued.
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", 200))
+AUDIT_OVERFLOW = os.getenv("AUDIT_OVERFLOW", "block").lower()  # block / drop
+AUDIT_BLOCK_TIMEOUT_MS = int(os.getenv("AUDIT_BLOCK_TIMEOUT_MS", 50))
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        session_factory=None,
+        maxsize: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_MS / 1000,
+        overflow: str = AUDIT_OVERFLOW,
+        block_timeout: float = AUDIT_BLOCK_TIMEOUT_MS / 1000,
+    ):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"Unknown audit overflow policy {overflow!r}")
+        self._session_factory = session_factory or SessionLocal
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.enqueued = self.written = self.dropped = self.failed = self.batches = 0
+
+    def record(self, action: str, user_id: Optional[int] = None, details: Optional[str] = None):
+        row = {
+            "user_id": user_id,
+            "action": action,
+            "details": details,
+            "timestamp": datetime.now(timezone.utc),
+        }
+        try:
+            if self.overflow == "block" and not _on_event_loop():
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            # Log the first drop and then every 1000th so a flood stays readable
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Audit queue full, %d events dropped so far", dropped)
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher after it has written everything queued so far."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            self._flush_all()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+        self._flush_all()
+
+    def _flush_all(self):
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            with self._session_factory() as db:
+                db.execute(insert(models.AuditLog), batch)
+                db.commit()
+        except Exception:
+            logger.exception("Failed to write %d audit events", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "overflow": self.overflow,
+            }
+
+
+writer = AuditWriter()
+
+
+def record(action: str, user_id: Optional[int] = None, details: Optional[str] = None):
+    writer.record(action, user_id, details)
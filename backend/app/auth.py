@@ -1,20 +1,93 @@
 # app/auth.py
+import asyncio
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 
-PWD_CTX = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Raising BCRYPT_ROUNDS makes passlib flag older hashes as needing an update;
+# login then rehashes them transparently.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PWD_CTX = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 SECRET_KEY = os.getenv("JWT_SECRET", "CHANGE_ME_TO_A_STRONG_SECRET")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 8*60))
 
+# bcrypt runs in its own process pool so a login storm cannot starve the
+# request threadpool. HASH_QUEUE_LIMIT caps running + queued hashes; past
+# it callers get HashPoolSaturated and the routers answer 503.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", min(4, os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", HASH_POOL_SIZE * 8))
+
+# Never fork the (threaded, connection-holding) API process itself: workers
+# come from a clean forkserver, or are spawned where that is unavailable
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+
 def verify_password(plain_pw: str, hashed_pw: str) -> bool:
     return PWD_CTX.verify(plain_pw, hashed_pw)
 
 def get_password_hash(password: str) -> str:
     return PWD_CTX.hash(password)
 
+def verify_and_update(plain_pw: str, hashed_pw: str):
+    """(ok, new_hash); new_hash is set when the stored hash needs upgrading."""
+    try:
+        return PWD_CTX.verify_and_update(plain_pw, hashed_pw)
+    except ValueError:
+        # Not a hash passlib recognises (e.g. seeded placeholder values)
+        return False, None
+
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE, mp_context=_MP_CONTEXT)
+        return _hash_pool
+
+def start_hash_pool():
+    """Start the pool and its workers; called from the app lifespan before other threads."""
+    _get_hash_pool().submit(os.getpid)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True, cancel_futures=True)
+            _hash_pool = None
+
+async def _offload(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashPoolSaturated()
+    try:
+        future = _get_hash_pool().submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+async def verify_and_update_async(plain_pw: str, hashed_pw: str):
+    return await _offload(verify_and_update, plain_pw, hashed_pw)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _offload(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -0,0 +1,60 @@
+# app/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds.
+
+    The cache is per process: with several workers each one keeps its own
+    copy, so explicit invalidation only reaches the local worker and the
+    TTL bounds how stale the others can get.
+
+    ``generation`` is bumped on every invalidation. A reader that snapshots
+    it before loading and passes it to ``set`` will not store a value that
+    was computed from data invalidated in the meantime.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
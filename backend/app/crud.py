@@ -1,13 +1,34 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from . import models, auth as _auth
+from sqlalchemy import Float, and_, cast, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from . import models, schedule, auth as _auth
+from .pagination import encode_cursor, decode_cursor
+from datetime import date, datetime, time
 from decimal import Decimal
 
 
-def create_user(db: Session, username: str, password: str, role: str):
-    user = models.User(
-        username=username, password_hash=_auth.get_password_hash(password), role=role
-    )
+# Loader strategies per response shape. "summary" feeds LoanSummaryOut list
+# routes from a single borrower join and refuses to lazy-load collections;
+# "detail" feeds LoanOut and batches each collection with one SELECT ... IN.
+LOAN_LOADERS = {
+    "summary": (
+        joinedload(models.Loan.borrower).load_only(models.Borrower.name),
+        raiseload("*"),
+    ),
+    "detail": (
+        joinedload(models.Loan.borrower),
+        joinedload(models.Loan.loan_type),
+        selectinload(models.Loan.collaterals),
+        selectinload(models.Loan.ledger_entries),
+    ),
+}
+
+
+def create_user(db: Session, username: str, password: str, role: str, password_hash: str = None):
+    # Callers that hashed off-thread pass password_hash and password=None
+    if password_hash is None:
+        password_hash = _auth.get_password_hash(password)
+    user = models.User(username=username, password_hash=password_hash, role=role)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -18,6 +39,12 @@ def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 
+def update_password_hash(db: Session, user, password_hash: str):
+    user.password_hash = password_hash
+    db.add(user)
+    db.commit()
+
+
 def create_borrower(db: Session, borrower_in):
     borrower = models.Borrower(**borrower_in.dict())
     db.add(borrower)
@@ -34,6 +61,80 @@ def list_borrowers(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Borrower).offset(skip).limit(limit).all()
 
 
+BORROWER_SEARCH_MODES = ("prefix", "fuzzy")
+
+
+def _like_prefix(q: str) -> str:
+    return q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def borrower_search_stmt(
+    q: str = None,
+    mode: str = "prefix",
+    credit_min: int = None,
+    credit_max: int = None,
+    income_min: Decimal = None,
+    income_max: Decimal = None,
+    cursor=None,
+    limit: int = 20,
+):
+    """Borrowers matching q and the ranges, as (Borrower, sort_key) rows.
+
+    prefix: lower(name) starts with q, in (lower(name), id) order, served
+        straight off idx_borrowers_name_prefix.
+    fuzzy: q is word-similar to name (pg_trgm <%, idx_borrowers_name_trgm),
+        best match first, then id.
+    Without q: every borrower in the ranges, in id order.
+    The credit/income ranges use idx_borrowers_credit_monthly.
+    """
+    B = models.Borrower
+    if not q:
+        sort_key, descending = B.id, False
+    elif mode == "prefix":
+        sort_key, descending = func.lower(B.name).collate("C"), False
+    else:
+        # word_similarity() is real; as double precision the value survives
+        # the JSON cursor exactly, so ties with the last row compare equal
+        sort_key, descending = cast(func.word_similarity(q, B.name), Float(precision=53)), True
+
+    stmt = select(B, sort_key.label("sort_key"))
+    if q and mode == "prefix":
+        # Backslash is LIKE's default escape character in PostgreSQL
+        stmt = stmt.where(sort_key.like(_like_prefix(q)))
+    elif q:
+        # name %> q is q <% name, written with the indexed column first
+        stmt = stmt.where(B.name.op("%>")(q))
+    if credit_min is not None:
+        stmt = stmt.where(B.credit_score >= credit_min)
+    if credit_max is not None:
+        stmt = stmt.where(B.credit_score <= credit_max)
+    if income_min is not None:
+        stmt = stmt.where(B.monthly_income >= income_min)
+    if income_max is not None:
+        stmt = stmt.where(B.monthly_income <= income_max)
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, 2)
+        if descending:
+            stmt = stmt.where(or_(sort_key < last_key, and_(sort_key == last_key, B.id > last_id)))
+        else:
+            stmt = stmt.where(tuple_(sort_key, B.id) > tuple_(last_key, last_id))
+    order = sort_key.desc() if descending else sort_key
+    return stmt.order_by(order, B.id).limit(limit + 1)
+
+
+def borrower_search_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].Borrower.id)
+    return [row.Borrower for row in rows], next_cursor
+
+
+def search_borrowers(db: Session, limit: int = 20, **filters):
+    rows = db.execute(borrower_search_stmt(limit=limit, **filters)).all()
+    return borrower_search_page(list(rows), limit)
+
+
 def create_loan(db: Session, loan_in):
     loan = models.Loan(**loan_in.dict(), status=models.LoanStatus.pending)
     db.add(loan)
@@ -42,5 +143,208 @@ def create_loan(db: Session, loan_in):
     return loan
 
 
-def get_loan(db: Session, loan_id: int):
-    return db.query(models.Loan).filter(models.Loan.id == loan_id).first()
+# Statement builders shared with crud_async
+def loan_stmt(loan_id: int, shape: str = None):
+    stmt = select(models.Loan).where(models.Loan.id == loan_id)
+    if shape:
+        stmt = stmt.options(*LOAN_LOADERS[shape])
+    return stmt
+
+
+def loan_version_stmt(loan_id: int):
+    return select(models.Loan.version).where(models.Loan.id == loan_id)
+
+
+def loan_detail_versions_stmt(loan_id: int):
+    """(loans.version, loan_types version) in one lookup, for the loan detail's ETag.
+
+    The loan_types version comes from reference_versions, so every worker
+    tags the same data the same way whatever its reference cache holds.
+    """
+    loan_types_version = (
+        select(models.ReferenceVersion.version)
+        .where(models.ReferenceVersion.name == models.LoanType.__tablename__)
+        .scalar_subquery()
+    )
+    return select(models.Loan.version, func.coalesce(loan_types_version, 0)).where(models.Loan.id == loan_id)
+
+
+def loan_page_stmt(
+    status=None,
+    borrower_id=None,
+    loan_type_id=None,
+    created_from=None,
+    created_to=None,
+    cursor=None,
+    limit: int = 50,
+    shape: str = "summary",
+):
+    stmt = select(models.Loan).options(*LOAN_LOADERS[shape])
+    if status is not None:
+        stmt = stmt.where(models.Loan.status == status)
+    if borrower_id is not None:
+        stmt = stmt.where(models.Loan.borrower_id == borrower_id)
+    if loan_type_id is not None:
+        stmt = stmt.where(models.Loan.loan_type_id == loan_type_id)
+    if created_from is not None:
+        stmt = stmt.where(models.Loan.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(models.Loan.created_at < created_to)
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, 2)
+        stmt = stmt.where(
+            tuple_(models.Loan.created_at, models.Loan.id)
+            < tuple_(last_created_at, last_id)
+        )
+    # One extra row tells us whether another page exists
+    return stmt.order_by(models.Loan.created_at.desc(), models.Loan.id.desc()).limit(limit + 1)
+
+
+def loan_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def repayments_for_loan_stmt(loan_id: int):
+    return (
+        select(models.Repayment)
+        .where(models.Repayment.loan_id == loan_id)
+        .order_by(models.Repayment.due_date)
+    )
+
+
+# Matches the predicate of the idx_repayments_overdue(_queue) partial indexes
+OVERDUE_CANDIDATE_STATUSES = ("due", "overdue")
+
+
+def _start_of(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def overdue_page_stmt(today: date, cursor=None, limit: int = 50):
+    """v_overdue_repayments shape, oldest due_date first, keyset on (due_date, id).
+
+    Each page is a range scan of idx_repayments_overdue_queue.
+    """
+    Repayment = models.Repayment
+    stmt = (
+        select(
+            Repayment.id.label("repayment_id"),
+            Repayment.loan_id,
+            models.Borrower.name.label("borrower_name"),
+            models.Borrower.address.label("borrower_address"),
+            Repayment.due_date,
+            Repayment.amount.label("amount_due"),
+            Repayment.paid_amount,
+        )
+        .join(models.Loan, models.Loan.id == Repayment.loan_id)
+        .join(models.Borrower, models.Borrower.id == models.Loan.borrower_id)
+        .where(Repayment.status.in_(OVERDUE_CANDIDATE_STATUSES))
+        .where(Repayment.due_date < _start_of(today))
+    )
+    if cursor:
+        last_due, last_id = decode_cursor(cursor, 2)
+        stmt = stmt.where(tuple_(Repayment.due_date, Repayment.id) > tuple_(last_due, last_id))
+    return stmt.order_by(Repayment.due_date, Repayment.id).limit(limit + 1)
+
+
+def overdue_page(rows, limit: int, today: date):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].due_date, rows[-1].repayment_id)
+    items = [
+        {**row._mapping, "days_overdue": (today - row.due_date.date()).days}
+        for row in rows
+    ]
+    return items, next_cursor
+
+
+def mark_overdue(db: Session, today: date = None, batch_size: int = 5000) -> int:
+    """Flip past-due 'due' installments to 'overdue', oldest due_date first.
+
+    Batches of batch_size candidates are found through idx_repayments_overdue.
+    Their loans are locked first (the order payers use), skipping loans a
+    payer holds; those rows are picked up on the next run. Each batch then
+    marks its rows, bumps the loans' versions (the schedules changed) and
+    commits, so locks stay short. Returns the number of rows marked.
+    """
+    Repayment, Loan = models.Repayment, models.Loan
+    cutoff = _start_of(today or datetime.utcnow().date())
+    total = 0
+    while True:
+        candidates = db.execute(
+            select(Repayment.id, Repayment.loan_id)
+            .where(Repayment.status == "due", Repayment.due_date < cutoff)
+            .order_by(Repayment.due_date)
+            .limit(batch_size)
+        ).all()
+        if not candidates:
+            return total
+        locked = db.execute(
+            select(Loan.id)
+            .where(Loan.id.in_(sorted({c.loan_id for c in candidates})))
+            .order_by(Loan.id)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        # status is re-checked in case a payment landed since the candidates were read
+        loan_ids = db.execute(
+            update(Repayment)
+            .where(
+                Repayment.id.in_([c.id for c in candidates]),
+                Repayment.loan_id.in_(locked),
+                Repayment.status == "due",
+            )
+            .values(status="overdue")
+            .returning(Repayment.loan_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        if loan_ids:
+            db.execute(
+                update(Loan)
+                .where(Loan.id.in_(sorted(set(loan_ids))))
+                .values(version=Loan.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        total += len(loan_ids)
+        # Stop when the backlog is done, or when everything left is locked
+        if len(candidates) < batch_size or not loan_ids:
+            return total
+
+
+def get_loan(db: Session, loan_id: int, shape: str = None):
+    return db.execute(loan_stmt(loan_id, shape)).scalars().first()
+
+
+def get_loan_version(db: Session, loan_id: int):
+    return db.execute(loan_version_stmt(loan_id)).scalar()
+
+
+def get_loan_detail_versions(db: Session, loan_id: int):
+    return db.execute(loan_detail_versions_stmt(loan_id)).first()
+
+
+def list_loans(db: Session, limit: int = 50, **filters):
+    """Keyset page of loans, newest first, ordered on (created_at, id).
+
+    Returns (loans, next_cursor); next_cursor is None on the last page.
+    """
+    rows = db.execute(loan_page_stmt(limit=limit, **filters)).scalars().all()
+    return loan_page(list(rows), limit)
+
+
+def list_repayments_for_loan(db: Session, loan_id: int):
+    """Written installments, then any a windowed schedule has not written yet."""
+    rows = db.execute(repayments_for_loan_stmt(loan_id)).scalars().all()
+    return list(rows) + schedule.projected(db.execute(schedule.schedule_params_stmt(loan_id)).first())
+
+
+def list_overdue_repayments(db: Session, today: date = None, cursor=None, limit: int = 50):
+    today = today or datetime.utcnow().date()
+    rows = db.execute(overdue_page_stmt(today, cursor, limit)).all()
+    return overdue_page(list(rows), limit, today)
@@ -0,0 +1,72 @@
+# app/crud_async.py
+# AsyncSession counterparts of the read paths in crud, used when DB_MODE=async.
+# Every relationship a response touches must be eagerly loaded here: lazy
+# loads are not allowed on an AsyncSession.
+from datetime import date, datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, portfolio, schedule
+from .crud import (
+    borrower_search_stmt, borrower_search_page,
+    loan_stmt, loan_version_stmt, loan_detail_versions_stmt, loan_page_stmt, loan_page, repayments_for_loan_stmt,
+    overdue_page_stmt, overdue_page,
+)
+
+
+async def get_borrower(db: AsyncSession, borrower_id: int):
+    return await db.get(models.Borrower, borrower_id)
+
+
+async def list_borrowers(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.Borrower).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def search_borrowers(db: AsyncSession, limit: int = 20, **filters):
+    result = await db.execute(borrower_search_stmt(limit=limit, **filters))
+    return borrower_search_page(list(result.all()), limit)
+
+
+async def get_loan(db: AsyncSession, loan_id: int, shape: str = "detail"):
+    result = await db.execute(loan_stmt(loan_id, shape))
+    return result.scalars().first()
+
+
+async def get_loan_version(db: AsyncSession, loan_id: int):
+    return (await db.execute(loan_version_stmt(loan_id))).scalar()
+
+
+async def get_loan_detail_versions(db: AsyncSession, loan_id: int):
+    return (await db.execute(loan_detail_versions_stmt(loan_id))).first()
+
+
+async def list_loans(db: AsyncSession, limit: int = 50, **filters):
+    result = await db.execute(loan_page_stmt(limit=limit, **filters))
+    return loan_page(list(result.scalars().all()), limit)
+
+
+async def list_repayments_for_loan(db: AsyncSession, loan_id: int):
+    rows = (await db.execute(repayments_for_loan_stmt(loan_id))).scalars().all()
+    params = (await db.execute(schedule.schedule_params_stmt(loan_id))).first()
+    return list(rows) + schedule.projected(params)
+
+
+async def list_overdue_repayments(db: AsyncSession, today: date = None, cursor=None, limit: int = 50):
+    today = today or datetime.utcnow().date()
+    result = await db.execute(overdue_page_stmt(today, cursor, limit))
+    return overdue_page(list(result.all()), limit, today)
+
+
+async def list_portfolio(db: AsyncSession, sort: str = "exposure", order: str = "desc", cursor=None, limit: int = 50):
+    result = await db.execute(portfolio.portfolio_page_stmt(sort, order, cursor, limit))
+    items, next_cursor = portfolio.portfolio_page(list(result.all()), limit, sort)
+    refreshed_at = (await db.execute(portfolio.refreshed_at_stmt())).scalar()
+    return items, next_cursor, refreshed_at
+
+
+async def get_borrower_portfolio(db: AsyncSession, borrower_id: int):
+    row = (await db.execute(portfolio.borrower_portfolio_stmt(borrower_id))).first()
+    if row:
+        return dict(row._mapping), (await db.execute(portfolio.refreshed_at_stmt())).scalar()
+    row = (await db.execute(portfolio.live_borrower_portfolio_stmt(borrower_id))).first()
+    return (dict(row._mapping) if row else None), datetime.now(timezone.utc)
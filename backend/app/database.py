@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv 
+from .pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, instrument
 import os
 
 load_dotenv()
@@ -13,9 +15,52 @@ DB_PORT = os.getenv("DB_PORT", 5432)  # default PostgreSQL port
 
 # Construct the SQLAlchemy DB URL
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# DB_MODE=async serves the read-heavy routes from an AsyncEngine (psycopg 3)
+# instead of blocking a threadpool thread per query; "sync" keeps the
+# original behaviour. Both stay available so they can be benchmarked.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DB = DB_MODE == "async"
 
-engine = create_engine(DATABASE_URL, future=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool sizing applies per engine (and per worker process). Timeouts are in
+# milliseconds and set server-side on every new connection; 0 disables them.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 60000))
+# Cut-off for fuzzy borrower search (the pg_trgm <% operator); the server
+# default of 0.6 misses most typos in short names
+DB_TRGM_WORD_SIMILARITY = float(os.getenv("DB_TRGM_WORD_SIMILARITY", 0.4))
+
+_server_options = " ".join(
+    f"-c {name}={value}"
+    for name, value in (
+        ("statement_timeout", DB_STATEMENT_TIMEOUT_MS),
+        ("idle_in_transaction_session_timeout", DB_IDLE_IN_TRANSACTION_TIMEOUT_MS),
+        ("pg_trgm.word_similarity_threshold", DB_TRGM_WORD_SIMILARITY),
+    )
+    if value
+)
+_engine_kwargs = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={"options": _server_options} if _server_options else {},
+)
+
+engine = create_engine(DATABASE_URL, future=True, poolclass=TimedQueuePool, **_engine_kwargs)
+engine_pool_stats = instrument(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
@@ -28,4 +73,26 @@ def get_db():
         db.close()
 
 
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, **_engine_kwargs)
+    if ASYNC_DB
+    else None
+)
+async_engine_pool_stats = instrument(async_engine) if ASYNC_DB else None
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if ASYNC_DB
+    else None
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency for routes that run in either mode (see deps.run_read)
+get_read_db = get_async_db if ASYNC_DB else get_db
+
+
 import app.models
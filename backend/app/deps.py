@@ -1,14 +1,38 @@
 # app/deps.py
+import os
+from typing import NamedTuple
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .database import get_db
+from .cache import TTLCache
+from .database import ASYNC_DB, get_read_db
 from . import auth as _auth, models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+
+class Principal(NamedTuple):
+    """The bits of a User that authorization needs, safe to share across requests."""
+    id: int
+    username: str
+    role: models.RoleEnum
+
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+_principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principal(username: str):
+    # Call after creating a user or changing their role
+    _principal_cache.invalidate(username)
+
+
+def _username_from_token(token: str) -> str:
     try:
         payload = _auth.decode_token(token)
         username = payload.get("sub")
@@ -16,13 +40,49 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise HTTPException(status_code=401, detail="Invalid authentication")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication")
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
+    return username
+
+
+async def run_read(db, sync_fn, async_fn, *args, **kwargs):
+    """Run a read against the session from get_read_db.
+
+    DB_MODE=async awaits the crud_async function on the AsyncSession; sync
+    mode runs the crud function in the threadpool as a `def` route would.
+    """
+    if ASYNC_DB:
+        return await async_fn(db, *args, **kwargs)
+    return await run_in_threadpool(sync_fn, db, *args, **kwargs)
+
+
+def _principal_stmt(username: str):
+    return select(models.User.id, models.User.username, models.User.role).where(
+        models.User.username == username
+    )
+
+
+def _load_principal(db: Session, username: str):
+    return db.execute(_principal_stmt(username)).first()
+
+
+async def _load_principal_async(db: AsyncSession, username: str):
+    return (await db.execute(_principal_stmt(username))).first()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_read_db)):
+    username = _username_from_token(token)
+    principal = _principal_cache.get(username)
+    if principal is not None:
+        return principal
+    generation = _principal_cache.generation
+    row = await run_read(db, _load_principal, _load_principal_async, username)
+    if not row:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    principal = Principal(row.id, row.username, row.role)
+    _principal_cache.set(username, principal, generation=generation)
+    return principal
 
 def require_roles(*roles):
-    def role_checker(current_user: models.User = Depends(get_current_user)):
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
         if current_user.role.value not in roles:
             raise HTTPException(status_code=403, detail="Forbidden")
         return current_user
@@ -0,0 +1,41 @@
+# app/etags.py
+# Weak ETags and If-None-Match handling for polled read endpoints.
+#
+# Tags are derived from a cheap version (e.g. loans.version) rather than a
+# hash of the body, so a revalidation costs one indexed lookup and a 304
+# skips loading and serializing the object graph. Responses carry
+# Cache-Control: no-cache, so browsers keep the body but revalidate every
+# time, sending If-None-Match on their own.
+from typing import Optional
+
+from fastapi import Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(p) for p in parts) + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in if_none_match.split(","))
+
+
+def set_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,265 @@
+# app/ingest.py
+# Bulk application of bank settlement files to repayments.
+#
+# Lines are parsed and validated as they stream in and applied in chunks of
+# INGEST_CHUNK_SIZE, one transaction per chunk. Within a chunk the affected
+# loans are locked in id order (so concurrent ingests and single payments
+# cannot deadlock), balances are worked out in Python, and repayments,
+# loans, receipts and ledger rows are each written with one set-based
+# statement.
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 1000))
+CSV_COLUMNS = ("repayment_id", "amount", "paid_on")
+
+CENT = Decimal("0.01")
+# repayments.paid_amount and ledger.amount are Numeric(12,2)
+MAX_AMOUNT = Decimal("9999999999.99")
+
+
+class LineError(ValueError):
+    pass
+
+
+class FileError(ValueError):
+    """The file as a whole is unusable (e.g. a bad CSV header).
+
+    Only raised before the first record, so nothing has been applied yet.
+    """
+
+
+async def iter_lines(byte_chunks):
+    """Yield raw lines (bytes, no line ending) from an async iterator of byte chunks.
+
+    Decoding is left to LineParser so one bad line is rejected on its own.
+    """
+    buf = b""
+    async for chunk in byte_chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buf:
+        yield buf.rstrip(b"\r")
+
+
+def _repayment_id(value) -> int:
+    # Only exact integers: int() would truncate 1.7 to 1 and take True as 1
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+        return int(value.strip())
+    raise LineError("repayment_id must be an integer")
+
+
+def parse_record(raw: dict) -> dict:
+    repayment_id = _repayment_id(raw.get("repayment_id"))
+    try:
+        amount = Decimal(str(raw["amount"]).strip())
+    except (KeyError, InvalidOperation):
+        raise LineError("amount must be a decimal number")
+    if not amount.is_finite() or amount <= 0:
+        raise LineError("Payment must be > 0")
+    if amount > MAX_AMOUNT:
+        raise LineError(f"amount must be <= {MAX_AMOUNT}")
+    try:
+        exact = amount == amount.quantize(CENT)
+    except InvalidOperation:
+        exact = False
+    if not exact:
+        raise LineError("amount has more than 2 decimal places")
+    try:
+        paid_on = datetime.fromisoformat(str(raw["paid_on"]).strip())
+    except (KeyError, ValueError):
+        raise LineError("paid_on must be an ISO date or datetime")
+    return {"repayment_id": repayment_id, "amount": amount, "paid_on": paid_on}
+
+
+class LineParser:
+    """Turns raw lines into (line_no, record | None, error | None)."""
+
+    def __init__(self, fmt: str):
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported format {fmt!r}")
+        self.fmt = fmt
+        self.header = None
+        self.line_no = 0
+
+    def feed(self, line):
+        self.line_no += 1
+        awaiting_header = self.fmt == "csv" and self.header is None
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError:
+                if awaiting_header:
+                    raise FileError("CSV header is not valid UTF-8")
+                return self.line_no, None, "Line is not valid UTF-8"
+        if not line.strip():
+            return None
+        if self.fmt == "csv":
+            try:
+                fields = next(csv.reader([line]))
+            except csv.Error as e:
+                if awaiting_header:
+                    raise FileError(f"Malformed CSV header: {e}")
+                return self.line_no, None, f"Malformed CSV line: {e}"
+            if awaiting_header:
+                self.header = [f.strip() for f in fields]
+                missing = set(CSV_COLUMNS) - set(self.header)
+                if missing:
+                    raise FileError(f"CSV header is missing {', '.join(sorted(missing))}")
+                return None
+            raw = dict(zip(self.header, fields))
+        else:
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                return self.line_no, None, "Invalid JSON"
+            if not isinstance(raw, dict):
+                return self.line_no, None, "Each line must be a JSON object"
+        try:
+            return self.line_no, parse_record(raw), None
+        except LineError as e:
+            return self.line_no, None, str(e)
+
+
+def _status_for(paid_amount: Decimal, amount: Decimal) -> str:
+    return "paid" if paid_amount >= amount else "partial"
+
+
+def apply_chunk(db: Session, items):
+    """Apply one chunk of parsed lines in a single transaction.
+
+    items is a list of (line_no, record) in file order. Returns one result
+    dict per item.
+    """
+    ids = sorted({rec["repayment_id"] for _, rec in items})
+    loan_of = dict(
+        db.execute(
+            select(models.Repayment.id, models.Repayment.loan_id).where(models.Repayment.id.in_(ids))
+        ).all()
+    )
+    loans = {
+        row.id: row
+        for row in db.execute(
+            select(models.Loan.id, models.Loan.outstanding, models.Loan.status, models.Loan.version)
+            .where(models.Loan.id.in_(sorted(set(loan_of.values()))))
+            .order_by(models.Loan.id)
+            .with_for_update()
+        )
+    }
+    # Repayment balances are read only once their loans are locked
+    rps = {
+        row.id: row
+        for row in db.execute(
+            select(
+                models.Repayment.id,
+                models.Repayment.loan_id,
+                models.Repayment.amount,
+                models.Repayment.paid_amount,
+                models.Receipt.id.label("receipt_id"),
+            )
+            .outerjoin(models.Receipt, models.Receipt.repayment_id == models.Repayment.id)
+            .where(models.Repayment.id.in_(ids))
+            .order_by(models.Repayment.id)
+            .with_for_update(of=models.Repayment)
+        )
+    }
+
+    paid = {rid: Decimal(row.paid_amount) for rid, row in rps.items()}
+    paid_on = {}
+    outstanding = {lid: Decimal(row.outstanding or 0) for lid, row in loans.items()}
+    status = {lid: row.status for lid, row in loans.items()}
+    has_receipt = {rid for rid, row in rps.items() if row.receipt_id is not None}
+    receipts, ledger, results = [], [], []
+    stamp = int(datetime.utcnow().timestamp())
+
+    for line_no, rec in items:
+        rid = rec["repayment_id"]
+        rp = rps.get(rid)
+        if rp is None:
+            results.append({"line": line_no, "repayment_id": rid, "status": "rejected", "detail": "Repayment not found"})
+            continue
+        amount = rec["amount"]
+        if paid[rid] + amount > MAX_AMOUNT:
+            # Would overflow paid_amount and fail the whole chunk
+            results.append({"line": line_no, "repayment_id": rid, "status": "rejected", "detail": "Paid amount too large"})
+            continue
+        paid[rid] = (paid[rid] + amount).quantize(CENT)
+        paid_on[rid] = rec["paid_on"]
+        lid = rp.loan_id
+        outstanding[lid] = (outstanding[lid] - amount).quantize(CENT)
+        if outstanding[lid] <= 0:
+            outstanding[lid] = Decimal("0.00")
+            status[lid] = models.LoanStatus.closed
+        if rid not in has_receipt:
+            # receipts.repayment_id is unique: one receipt per installment
+            has_receipt.add(rid)
+            receipts.append({"repayment_id": rid, "receipt_number": f"REC-{stamp}-{rid}"})
+        ledger.append({
+            "loan_id": lid,
+            "type": "repayment",
+            "amount": amount,
+            "date": rec["paid_on"],
+            "balance_after": outstanding[lid],
+        })
+        results.append({
+            "line": line_no,
+            "repayment_id": rid,
+            "status": "applied",
+            "repayment_status": _status_for(paid[rid], Decimal(rp.amount)),
+            "loan_outstanding": outstanding[lid],
+        })
+
+    if paid_on:
+        db.execute(
+            update(models.Repayment),
+            [
+                {
+                    "id": rid,
+                    "paid_amount": paid[rid],
+                    "paid_on": paid_on[rid],
+                    "status": _status_for(paid[rid], Decimal(rps[rid].amount)),
+                }
+                for rid in paid_on
+            ],
+        )
+        touched = {rps[rid].loan_id for rid in paid_on}
+        db.execute(
+            update(models.Loan),
+            [
+                {"id": lid, "outstanding": outstanding[lid], "status": status[lid], "version": loans[lid].version + 1}
+                for lid in sorted(touched)
+            ],
+        )
+    if receipts:
+        db.execute(insert(models.Receipt), receipts)
+    if ledger:
+        db.execute(insert(models.Ledger), ledger)
+    db.commit()
+    return results
+
+
+def apply_chunk_safely(db: Session, items):
+    try:
+        return apply_chunk(db, items)
+    except Exception as exc:
+        logger.exception("Payment ingest chunk failed (lines %s-%s)", items[0][0], items[-1][0])
+        db.rollback()
+        return [
+            {"line": line_no, "repayment_id": rec["repayment_id"], "status": "error", "detail": f"Chunk failed: {exc}"}
+            for line_no, rec in items
+        ]
@@ -0,0 +1,50 @@
+# app/jobs.py
+# Background jobs run by app.scheduler. An interval of 0 disables a job.
+import logging
+import os
+
+from . import crud, portfolio, reference, schedule
+from .database import SessionLocal
+from .scheduler import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_JOB_INTERVAL = float(os.getenv("OVERDUE_JOB_INTERVAL", 3600))
+OVERDUE_BATCH_SIZE = int(os.getenv("OVERDUE_BATCH_SIZE", 5000))
+PORTFOLIO_REFRESH_INTERVAL = float(os.getenv("PORTFOLIO_REFRESH_INTERVAL", 300))
+SCHEDULE_EXTEND_INTERVAL = float(os.getenv("SCHEDULE_EXTEND_INTERVAL", 3600))
+SCHEDULE_EXTEND_BATCH = int(os.getenv("SCHEDULE_EXTEND_BATCH", 1000))
+
+
+def mark_overdue_job():
+    with SessionLocal() as db:
+        marked = crud.mark_overdue(db, batch_size=OVERDUE_BATCH_SIZE)
+    if marked:
+        logger.info("Marked %d repayments overdue", marked)
+
+
+def refresh_portfolio_job():
+    with SessionLocal() as db:
+        if not portfolio.refresh(db):
+            logger.debug("Skipped %s refresh: already running elsewhere", portfolio.PORTFOLIO_VIEW)
+
+
+def extend_schedules_job():
+    with SessionLocal() as db:
+        written = schedule.extend_windows(db, batch_size=SCHEDULE_EXTEND_BATCH)
+    if written:
+        logger.info("Wrote %d upcoming repayment installments", written)
+
+
+def check_reference_data_job():
+    reference.loan_types.check()
+
+
+def enabled_jobs():
+    jobs = [
+        PeriodicJob("mark_overdue", OVERDUE_JOB_INTERVAL, mark_overdue_job),
+        PeriodicJob("refresh_portfolio", PORTFOLIO_REFRESH_INTERVAL, refresh_portfolio_job),
+        PeriodicJob("extend_schedules", SCHEDULE_EXTEND_INTERVAL, extend_schedules_job),
+        PeriodicJob("check_reference_data", reference.REFERENCE_POLL_INTERVAL, check_reference_data_job),
+    ]
+    return [job for job in jobs if job.interval > 0]
@@ -1,11 +1,40 @@
 # app/main.py
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from . import audit, auth as _auth, database, jobs, request_metrics
+from .responses import ORJSONResponse
 from .database import engine, Base
-from .routers import auth, users, borrowers, loans, repayments, reports
+from .scheduler import Scheduler
+from .routers import auth, users, borrowers, loans, repayments, reports, metrics, exports
 
 
-app = FastAPI(title="Ka-Ro Loan Management API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # First, before the audit writer and scheduler threads exist
+    _auth.start_hash_pool()
+    audit.writer.start()
+    scheduler = Scheduler()
+    scheduler.start(jobs.enabled_jobs())
+    yield
+    await scheduler.stop()
+    _auth.shutdown_hash_pool()
+    # Last, so events recorded during shutdown are flushed too
+    await run_in_threadpool(audit.writer.stop)
+
+
+# Bodies smaller than this go out uncompressed; GZIP_MIN_SIZE=0 disables gzip
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+
+app = FastAPI(
+    title="Ka-Ro Loan Management API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 origins = ["*"]
 
@@ -15,7 +44,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+if GZIP_MIN_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+# Outermost, so Server-Timing and the route histograms cover the whole stack
+app.add_middleware(request_metrics.RequestMetricsMiddleware)
+request_metrics.instrument_engine(database.engine)
+if database.ASYNC_DB:
+    request_metrics.instrument_engine(database.async_engine)
+request_metrics.instrument_endpoints()
 
 
 @app.get("/")
@@ -29,3 +67,5 @@ app.include_router(borrowers.router)
 app.include_router(loans.router)
 app.include_router(repayments.router)
 app.include_router(reports.router)
+app.include_router(metrics.router)
+app.include_router(exports.router)
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Numeric, Boolean, Text, Date
+from sqlalchemy import and_, BigInteger, Column, Integer, String, Float, ForeignKey, DateTime, Enum, Numeric, Boolean, Text, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -27,6 +27,12 @@ class LoanType(Base):
     base_interest_rate = Column(Float, nullable=False)
     loans = relationship("Loan", back_populates="loan_type")
 
+class ReferenceVersion(Base):
+    # Bumped by a trigger on every write to the named table; see app/reference.py
+    __tablename__ = "reference_versions"
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+
 class Borrower(Base):
     __tablename__ = "borrowers"
     id = Column(Integer, primary_key=True, index=True)
@@ -58,6 +64,14 @@ class Loan(Base):
     status = Column(Enum(LoanStatus), default=LoanStatus.pending)
     outstanding = Column(Numeric(12,2), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every write to the loan or its schedule; the ETag of the
+    # loan detail and repayment schedule endpoints
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # full: every installment written at disbursement. windowed: only the
+    # first installments_materialized rows exist; the rest are computed from
+    # principal/interest_rate/term_months/disbursed_on (app/schedule.py)
+    schedule_mode = Column(String(16), nullable=False, default="full", server_default="full")
+    installments_materialized = Column(Integer, nullable=True)
     
     borrower = relationship("Borrower", back_populates="loans")
     loan_type = relationship("LoanType", back_populates="loans")
@@ -65,6 +79,21 @@ class Loan(Base):
     collaterals = relationship("Collateral", back_populates="loan", cascade="all, delete-orphan")
     ledger_entries = relationship("Ledger", back_populates="loan", cascade="all, delete-orphan")
 
+    @property
+    def borrower_name(self):
+        return self.borrower.name if self.borrower else None
+
+    __table_args__ = (
+        Index("idx_loans_status", "status"),
+        Index("idx_loans_borrower_status", "borrower_id", "status"),
+        Index("idx_loans_created_at_id", "created_at", "id"),  # keyset pagination
+        # Windowed schedules the extend job still has to grow
+        Index(
+            "idx_loans_schedule_window", "id",
+            postgresql_where=and_(schedule_mode == "windowed", installments_materialized < term_months),
+        ),
+    )
+
 class Collateral(Base):
     __tablename__ = "collateral"
     id = Column(Integer, primary_key=True, index=True)
@@ -81,7 +110,8 @@ class Ledger(Base):
     loan_id = Column(Integer, ForeignKey("loans.id"), nullable=False)
     type = Column(String(32), nullable=False) # "disbursement", "repayment", "penalty"
     amount = Column(Numeric(12, 2), nullable=False)
-    date = Column(DateTime(timezone=True), server_default=func.now())
+    # PostgreSQL partitions ledger by month on date (app/partitions.py)
+    date = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     balance_after = Column(Numeric(12, 2), nullable=True)
     loan = relationship("Loan", back_populates="ledger_entries")
 
@@ -97,6 +127,19 @@ class Repayment(Base):
     loan = relationship("Loan", back_populates="repayments")
     receipt = relationship("Receipt", back_populates="repayment", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Overdue queue: past-due installments that are still unpaid
+        Index(
+            "idx_repayments_overdue", "status", "due_date",
+            postgresql_where=status.in_(("due", "overdue")),
+        ),
+        # GET /repayments/overdue keyset order, across both statuses
+        Index(
+            "idx_repayments_overdue_queue", "due_date", "id",
+            postgresql_where=status.in_(("due", "overdue")),
+        ),
+    )
+
 class Receipt(Base):
     __tablename__ = "receipts"
     id = Column(Integer, primary_key=True, index=True)
@@ -105,10 +148,14 @@ class Receipt(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     repayment = relationship("Repayment", back_populates="receipt")
 
+    __table_args__ = (
+        Index("idx_receipts_created_at", "created_at", "id"),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     action = Column(String(64), nullable=False)
     details = Column(Text, nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # partition key
@@ -0,0 +1,41 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+
+# Keyset cursors are opaque to clients: a urlsafe base64 JSON list holding the
+# sort-key values of the last row on the previous page.
+def encode_cursor(*values) -> str:
+    out = []
+    for v in values:
+        if isinstance(v, datetime):
+            out.append({"dt": v.isoformat()})
+        elif isinstance(v, Decimal):
+            out.append({"dec": str(v)})
+        else:
+            out.append(v)
+    raw = json.dumps(out, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor size mismatch")
+        out = []
+        for v in values:
+            if isinstance(v, dict) and "dt" in v:
+                out.append(datetime.fromisoformat(v["dt"]))
+            elif isinstance(v, dict) and "dec" in v:
+                out.append(Decimal(v["dec"]))
+            else:
+                out.append(v)
+        return out
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, "Invalid cursor")
@@ -0,0 +1,314 @@
+# app/partitions.py
+# Monthly range partitions for the append-only ledger and audit_logs tables
+# (PostgreSQL only; see migration 7e2c9b4f0a13).
+#
+# Partitions are named <table>_pYYYYMM and cover [month, next month) of the
+# partition key, in UTC; <table>_default catches anything outside them. Old
+# months are dumped to <ARCHIVE_DIR>/<table>/<table>_pYYYYMM.csv.gz (CSV
+# with a header row, written by COPY), detached and dropped. Only the detach
+# locks the parent table, and it runs in a transaction of its own so
+# payments and audit writes wait for it briefly, not for the dump. Archived
+# months can be read back as rows, or loaded into a temp table to run SQL
+# against.
+#
+#   python -m app.partitions ensure [--months-ahead 3]
+#   python -m app.partitions archive [--retain-months 24]
+#   python -m app.partitions read ledger 2024-01 [--where loan_id=42]
+import argparse
+import csv
+import gzip
+import os
+import re
+import sys
+from datetime import date, datetime, time, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    "ledger": "date",
+    "audit_logs": "timestamp",
+}
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+PARTITION_RETAIN_MONTHS = int(os.getenv("PARTITION_RETAIN_MONTHS", 24))
+ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "archive")
+# How long ATTACH/DETACH may queue for a table lock. Writers queue behind a
+# waiting ALTER, so give up rather than stall them; the next run retries.
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(d) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def archive_path(table: str, month: date, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, table, f"{partition_name(table, month)}.csv.gz")
+
+
+def _check_table(table: str):
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table!r} is not a partitioned table")
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    return bool(db.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"),
+        {"table": table},
+    ).first())
+
+
+def list_partitions(db: Session, table: str):
+    """Months that currently have an attached partition, oldest first."""
+    _check_table(table)
+    names = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ),
+        {"table": table},
+    ).scalars()
+    months = []
+    for name in names:
+        m = _MONTH_SUFFIX.search(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def list_detached(db: Session, table: str):
+    """Months whose partition was detached but not yet archived and dropped, oldest first."""
+    _check_table(table)
+    names = db.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relname LIKE :pattern AND relkind = 'r' AND NOT relispartition"
+        ),
+        {"pattern": f"{table}\\_p%"},
+    ).scalars()
+    months = []
+    for name in names:
+        m = _MONTH_SUFFIX.search(name)
+        if m and name == f"{table}_p{m.group(1)}{m.group(2)}":
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def _lock_timeout(db: Session):
+    db.execute(text("SELECT set_config('lock_timeout', :t, true)"), {"t": PARTITION_LOCK_TIMEOUT})
+
+
+def create_partition(db: Session, table: str, month: date):
+    """Create and attach the partition for month.
+
+    Rows for that month that already landed in the default partition are
+    moved into the new one first, since attaching would otherwise fail. The
+    default partition is locked before the move so no row for the month can
+    land in it between the move and the attach; writes to other months go
+    to their own partitions and do not wait.
+    """
+    _check_table(table)
+    key = PARTITIONED_TABLES[table]
+    name = partition_name(table, month)
+    # Month boundaries are in UTC, independent of the session's TimeZone
+    bounds = {
+        "lo": datetime.combine(month, time.min, timezone.utc),
+        "hi": datetime.combine(add_months(month, 1), time.min, timezone.utc),
+    }
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    _lock_timeout(db)
+    db.execute(text(f"LOCK TABLE {table}_default IN ACCESS EXCLUSIVE MODE"))
+    db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {table}_default "
+            f"WHERE {key} >= :lo AND {key} < :hi RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    db.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['lo'].isoformat()}') TO ('{bounds['hi'].isoformat()}')"
+        )
+    )
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD, today: date = None):
+    """Create any missing partitions from the current month to months_ahead. Returns the names created."""
+    current = month_start(today or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = set(list_partitions(db, table))
+        for i in range(months_ahead + 1):
+            month = add_months(current, i)
+            if month not in existing:
+                create_partition(db, table, month)
+                created.append(partition_name(table, month))
+        db.commit()
+    return created
+
+
+def _copy_out(db: Session, sql: str, fileobj):
+    # psycopg2 (the sync driver) streams COPY straight into the file
+    db.connection().connection.driver_connection.cursor().copy_expert(sql, fileobj)
+
+
+def _dump(db: Session, table: str, month: date, name: str, tmp: str) -> int:
+    """COPY name into tmp and check the file holds every row. Returns the row count."""
+    rows = db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+    with gzip.open(tmp, "wb") as raw:
+        _copy_out(db, f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", raw)
+    written = sum(1 for _ in read_archive(table, month, path=tmp))
+    if written != rows:
+        raise RuntimeError(f"{name}: archived {written} rows, expected {rows}")
+    return rows
+
+
+def archive_partition(db: Session, table: str, month: date, archive_dir: str = ARCHIVE_DIR) -> int:
+    """Dump month's partition to a gzip CSV, then detach and drop it.
+
+    Three transactions, so the parent table is only locked for the detach:
+
+    1. COPY the still-attached partition, holding a lock on that partition
+       alone (writes to other months carry on) so the dump is complete.
+    2. DETACH, giving up after PARTITION_LOCK_TIMEOUT.
+    3. Recount the now standalone table, dump it again if a row for the
+       month slipped in between 1 and 2, rename the file into place and
+       DROP the table.
+
+    The file is written under a temporary name and only renamed into place
+    once its row count matches. A failure in 1 or 2 leaves the partition
+    attached; a failure in 3 leaves it detached, and list_detached() /
+    archive_partitions() pick it up again. Returns the number of rows
+    archived.
+    """
+    _check_table(table)
+    name = partition_name(table, month)
+    path = archive_path(table, month, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    try:
+        rows = None
+        if month in list_partitions(db, table):
+            db.execute(text("SET LOCAL statement_timeout = 0"))
+            db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+            rows = _dump(db, table, month, name, tmp)
+            db.commit()
+
+            _lock_timeout(db)
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            db.commit()
+
+        db.execute(text("SET LOCAL statement_timeout = 0"))
+        if rows is None or db.execute(text(f"SELECT count(*) FROM {name}")).scalar() != rows:
+            rows = _dump(db, table, month, name, tmp)
+        os.replace(tmp, path)
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return rows
+
+
+def archive_partitions(db: Session, retain_months: int = PARTITION_RETAIN_MONTHS,
+                       archive_dir: str = ARCHIVE_DIR, today: date = None):
+    """Archive every partition older than retain_months. Returns {partition: rows}."""
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc)), -retain_months)
+    done = {}
+    for table in PARTITIONED_TABLES:
+        # Detached by an earlier run that failed before the drop
+        for month in list_detached(db, table):
+            done[partition_name(table, month)] = archive_partition(db, table, month, archive_dir)
+        for month in list_partitions(db, table):
+            if month < cutoff:
+                done[partition_name(table, month)] = archive_partition(db, table, month, archive_dir)
+    return done
+
+
+def read_archive(table: str, month: date, archive_dir: str = ARCHIVE_DIR, where: dict = None, path: str = None):
+    """Yield an archived month's rows as dicts of strings, optionally filtered on column == value."""
+    _check_table(table)
+    where = {k: str(v) for k, v in (where or {}).items()}
+    with gzip.open(path or archive_path(table, month, archive_dir), "rt", newline="") as f:
+        for row in csv.DictReader(f):
+            if all(row.get(k) == v for k, v in where.items()):
+                yield row
+
+
+def load_archive(db: Session, table: str, month: date, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Load an archived month into a temp table shaped like table and return its name.
+
+    The temp table lives until the session's connection is returned, so run
+    the queries on the same session.
+    """
+    _check_table(table)
+    name = f"archived_{partition_name(table, month)}"
+    db.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {name} (LIKE {table})"))
+    with gzip.open(archive_path(table, month, archive_dir), "rb") as f:
+        cur = db.connection().connection.driver_connection.cursor()
+        cur.copy_expert(f"COPY {name} FROM STDIN WITH (FORMAT csv, HEADER true)", f)
+    return name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ledger / audit log partition maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ensure", help="create partitions ahead of time")
+    p.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    p = sub.add_parser("archive", help="dump, detach and drop old partitions")
+    p.add_argument("--retain-months", type=int, default=PARTITION_RETAIN_MONTHS)
+    p.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    p = sub.add_parser("read", help="print an archived month as CSV")
+    p.add_argument("table", choices=sorted(PARTITIONED_TABLES))
+    p.add_argument("month", type=parse_month, help="YYYY-MM")
+    p.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE")
+    p.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "read":
+        where = dict(w.split("=", 1) for w in args.where)
+        writer = None
+        for row in read_archive(args.table, args.month, args.archive_dir, where):
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+        return
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        if args.command == "ensure":
+            created = ensure_partitions(db, args.months_ahead)
+            print("created:", ", ".join(created) if created else "nothing")
+        else:
+            done = archive_partitions(db, args.retain_months, args.archive_dir)
+            for name, rows in done.items():
+                print(f"archived {name}: {rows} rows")
+            if not done:
+                print("nothing to archive")
+
+
+if __name__ == "__main__":
+    main()
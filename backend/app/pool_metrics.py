@@ -0,0 +1,107 @@
+# app/pool_metrics.py
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Counters for one engine's connection pool, fed by pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "pool_class": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "checkouts_total": self.checkouts,
+                "checkins_total": self.checkins,
+                "connects_total": self.connects,
+                "invalidations_total": self.invalidations,
+                "timeouts_total": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / waits, 6) if waits else 0.0,
+            }
+
+
+class _TimedCheckoutMixin:
+    # Pool events fire once a connection is handed out, so the time spent
+    # waiting for one (and QueuePool timeouts) is measured around connect().
+    stats: PoolStats = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine) -> PoolStats:
+    """Attach a PoolStats to engine's pool (sync Engine or AsyncEngine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    stats = PoolStats()
+    sync_engine.pool.stats = stats
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        stats.incr("checkouts")
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        stats.incr("checkins")
+
+    @event.listens_for(sync_engine, "connect")
+    def _connect(dbapi_conn, record):
+        stats.incr("connects")
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        stats.incr("invalidations")
+
+    return stats
@@ -0,0 +1,153 @@
+# app/portfolio.py
+# Borrower portfolio totals, served from the v_borrower_portfolio
+# materialized view (PostgreSQL, migration 9c3e5a7b1d24).
+#
+# The view is refreshed CONCURRENTLY by the scheduler (jobs.py), so readers
+# are never blocked, and each refresh is stamped in matview_refreshes;
+# responses carry that time so clients can tell how stale the figures are.
+# A borrower created since the last refresh is computed live instead.
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Numeric, String, Table, func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from . import models
+from .pagination import encode_cursor, decode_cursor
+
+PORTFOLIO_VIEW = "v_borrower_portfolio"
+
+# Not on Base.metadata: create_all must not turn the view into a table
+view_metadata = MetaData()
+
+borrower_portfolio = Table(
+    PORTFOLIO_VIEW,
+    view_metadata,
+    Column("borrower_id", Integer, primary_key=True),
+    Column("borrower_name", String(256)),
+    Column("credit_score", Integer),
+    Column("total_loans_count", Integer),
+    Column("active_loans_count", Integer),
+    Column("total_principal_disbursed", Numeric(14, 2)),
+    Column("total_outstanding_amount", Numeric(14, 2)),
+    Column("total_repaid_principal", Numeric(14, 2)),
+    Column("exposure", Numeric(14, 2)),
+)
+
+matview_refreshes = Table(
+    "matview_refreshes",
+    view_metadata,
+    Column("view_name", String(64), primary_key=True),
+    Column("refreshed_at", DateTime(timezone=True), nullable=False),
+)
+
+# sort name -> view column, each backed by a (column, borrower_id) index
+PORTFOLIO_SORTS = {
+    "exposure": borrower_portfolio.c.exposure,
+    "outstanding": borrower_portfolio.c.total_outstanding_amount,
+}
+
+
+def portfolio_page_stmt(sort: str = "exposure", order: str = "desc", cursor=None, limit: int = 50):
+    key = PORTFOLIO_SORTS[sort]
+    bid = borrower_portfolio.c.borrower_id
+    stmt = select(borrower_portfolio)
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, 2)
+        if order == "desc":
+            stmt = stmt.where(tuple_(key, bid) < tuple_(last_key, last_id))
+        else:
+            stmt = stmt.where(tuple_(key, bid) > tuple_(last_key, last_id))
+    if order == "desc":
+        stmt = stmt.order_by(key.desc(), bid.desc())
+    else:
+        stmt = stmt.order_by(key, bid)
+    return stmt.limit(limit + 1)
+
+
+def portfolio_page(rows, limit: int, sort: str):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(last[PORTFOLIO_SORTS[sort].name], last["borrower_id"])
+    return [dict(row._mapping) for row in rows], next_cursor
+
+
+def borrower_portfolio_stmt(borrower_id: int):
+    return select(borrower_portfolio).where(borrower_portfolio.c.borrower_id == borrower_id)
+
+
+def live_borrower_portfolio_stmt(borrower_id: int):
+    """The view's definition for one borrower, straight off the base tables."""
+    B, L = models.Borrower, models.Loan
+    exposure_filter = L.status.in_((models.LoanStatus.approved, models.LoanStatus.active))
+    return (
+        select(
+            B.id.label("borrower_id"),
+            B.name.label("borrower_name"),
+            B.credit_score,
+            func.count(L.id).label("total_loans_count"),
+            func.count(L.id).filter(L.status == models.LoanStatus.active).label("active_loans_count"),
+            func.coalesce(func.sum(L.principal), 0).label("total_principal_disbursed"),
+            func.coalesce(func.sum(L.outstanding), 0).label("total_outstanding_amount"),
+            func.coalesce(func.sum(L.principal - L.outstanding), 0).label("total_repaid_principal"),
+            func.coalesce(
+                func.sum(func.coalesce(L.outstanding, L.principal)).filter(exposure_filter), 0
+            ).label("exposure"),
+        )
+        .outerjoin(L, L.borrower_id == B.id)
+        .where(B.id == borrower_id)
+        .group_by(B.id, B.name, B.credit_score)
+    )
+
+
+def refreshed_at_stmt():
+    return select(matview_refreshes.c.refreshed_at).where(matview_refreshes.c.view_name == PORTFOLIO_VIEW)
+
+
+def staleness(refreshed_at) -> dict:
+    age = (datetime.now(timezone.utc) - refreshed_at).total_seconds() if refreshed_at else None
+    return {"refreshed_at": refreshed_at, "age_seconds": age}
+
+
+def list_portfolio(db: Session, sort: str = "exposure", order: str = "desc", cursor=None, limit: int = 50):
+    """Returns (rows, next_cursor, refreshed_at)."""
+    rows = db.execute(portfolio_page_stmt(sort, order, cursor, limit)).all()
+    items, next_cursor = portfolio_page(list(rows), limit, sort)
+    return items, next_cursor, db.execute(refreshed_at_stmt()).scalar()
+
+
+def get_borrower_portfolio(db: Session, borrower_id: int):
+    """Returns (row, refreshed_at); refreshed_at is now for a live row, row is None if no such borrower."""
+    row = db.execute(borrower_portfolio_stmt(borrower_id)).first()
+    if row:
+        return dict(row._mapping), db.execute(refreshed_at_stmt()).scalar()
+    row = db.execute(live_borrower_portfolio_stmt(borrower_id)).first()
+    return (dict(row._mapping) if row else None), datetime.now(timezone.utc)
+
+
+def refresh(db: Session) -> bool:
+    """REFRESH ... CONCURRENTLY and stamp the time; False if another worker holds the refresh."""
+    # One refresh at a time across workers; the others skip rather than queue
+    got_lock = db.execute(
+        text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"), {"name": PORTFOLIO_VIEW}
+    ).scalar()
+    if not got_lock:
+        db.rollback()
+        return False
+    db.execute(text("SET LOCAL statement_timeout = 0"))
+    populated = db.execute(
+        text("SELECT ispopulated FROM pg_matviews WHERE matviewname = :name"), {"name": PORTFOLIO_VIEW}
+    ).scalar()
+    # CONCURRENTLY only works on a view that has been populated once
+    concurrently = "CONCURRENTLY " if populated else ""
+    db.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{PORTFOLIO_VIEW}"))
+    db.execute(
+        text(
+            "INSERT INTO matview_refreshes (view_name, refreshed_at) VALUES (:name, now()) "
+            "ON CONFLICT (view_name) DO UPDATE SET refreshed_at = excluded.refreshed_at"
+        ),
+        {"name": PORTFOLIO_VIEW},
+    )
+    db.commit()
+    return True
@@ -0,0 +1,172 @@
+# app/receipts.py
+# Receipt rendering and bulk export.
+#
+# Receipts are rendered from one precompiled string.Template; the data comes
+# from a single joined query. A receipt never changes once issued, but the
+# amount it shows is the installment's running paid_amount, so cached HTML
+# is keyed on the receipt plus (paid_amount, paid_on) and a later partial
+# payment simply misses the cache instead of needing an invalidation.
+import os
+import zipfile
+from datetime import date, datetime, time, timedelta
+from html import escape
+from string import Template
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .exports import stream_partitions
+from .cache import TTLCache
+
+RECEIPT_CACHE_SIZE = int(os.getenv("RECEIPT_CACHE_SIZE", 1024))
+RECEIPT_CACHE_TTL = float(os.getenv("RECEIPT_CACHE_TTL", 3600))
+EXPORT_YIELD_PER = int(os.getenv("RECEIPT_EXPORT_YIELD_PER", 500))
+
+_receipt_cache = TTLCache(maxsize=RECEIPT_CACHE_SIZE, ttl=RECEIPT_CACHE_TTL)
+
+RECEIPT_TEMPLATE = Template("""
+    <html>
+        <head>
+            <title>Receipt $receipt_number</title>
+            <style>
+                body { font-family: Arial, sans-serif; padding: 40px; max_width: 800px; margin: 0 auto; }
+                .header { text-align: center; margin-bottom: 40px; }
+                .details { margin-bottom: 30px; }
+                .row { display: flex; justify-content: space-between; margin-bottom: 10px; border-bottom: 1px solid #eee; padding-bottom: 5px; }
+                .label { font-weight: bold; }
+                .footer { margin-top: 50px; text-align: center; font-size: 0.8em; color: #666; }
+                @media print {
+                    body { padding: 0; }
+                    .no-print { display: none; }
+                }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>Payment Receipt</h1>
+                <p>Receipt #: $receipt_number</p>
+                <p>Date: $issued_at</p>
+            </div>
+
+            <div class="details">
+                <div class="row">
+                    <span class="label">Borrower Name:</span>
+                    <span>$borrower_name</span>
+                </div>
+                <div class="row">
+                    <span class="label">Loan ID:</span>
+                    <span>$loan_id</span>
+                </div>
+                <div class="row">
+                    <span class="label">Repayment ID:</span>
+                    <span>$repayment_id</span>
+                </div>
+                <div class="row">
+                    <span class="label">Amount Paid:</span>
+                    <span>$paid_amount</span>
+                </div>
+                 <div class="row">
+                    <span class="label">Payment Date:</span>
+                    <span>$paid_on</span>
+                </div>
+            </div>
+
+            <div class="footer">
+                <p>Thank you for your payment.</p>
+                <button class="no-print" onclick="window.print()" style="padding: 10px 20px; cursor: pointer; background: #007bff; color: white; border: none; border-radius: 5px;">Print Receipt</button>
+            </div>
+        </body>
+    </html>
+    """)
+
+
+def receipt_stmt():
+    """Everything a receipt shows, one row per repayment (receipt columns may be NULL)."""
+    return (
+        select(
+            models.Repayment.id.label("repayment_id"),
+            models.Repayment.loan_id,
+            models.Repayment.paid_amount,
+            models.Repayment.paid_on,
+            models.Borrower.name.label("borrower_name"),
+            models.Receipt.id.label("receipt_id"),
+            models.Receipt.receipt_number,
+            models.Receipt.created_at,
+        )
+        .join(models.Loan, models.Loan.id == models.Repayment.loan_id)
+        .join(models.Borrower, models.Borrower.id == models.Loan.borrower_id)
+        .outerjoin(models.Receipt, models.Receipt.repayment_id == models.Repayment.id)
+    )
+
+
+def get_receipt_row(db: Session, repayment_id: int):
+    return db.execute(receipt_stmt().where(models.Repayment.id == repayment_id)).first()
+
+
+def render_receipt(row) -> str:
+    return RECEIPT_TEMPLATE.substitute(
+        receipt_number=escape(row.receipt_number),
+        issued_at=row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else 'N/A',
+        borrower_name=escape(row.borrower_name),
+        loan_id=row.loan_id,
+        repayment_id=row.repayment_id,
+        paid_amount=row.paid_amount,
+        paid_on=row.paid_on.strftime('%Y-%m-%d') if row.paid_on else 'N/A',
+    )
+
+
+def cached_receipt(row) -> str:
+    key = (row.receipt_id, str(row.paid_amount), row.paid_on)
+    html = _receipt_cache.get(key)
+    if html is None:
+        html = render_receipt(row)
+        _receipt_cache.set(key, html)
+    return html
+
+
+class _ZipChunks:
+    """Write-only sink for ZipFile; the bytes written so far are drained by the streamer.
+
+    It has no seek/tell, so ZipFile writes data descriptors and never goes
+    back to patch headers, which is what allows streaming.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def export_stmt(date_from: Optional[date], date_to: Optional[date]):
+    stmt = receipt_stmt().where(models.Receipt.id.isnot(None))
+    if date_from:
+        stmt = stmt.where(models.Receipt.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        # date_to is inclusive
+        stmt = stmt.where(models.Receipt.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    return stmt.order_by(models.Receipt.created_at, models.Receipt.id)
+
+
+def iter_receipts_zip(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Yield a zip archive of receipt HTML files, one receipt at a time."""
+    sink = _ZipChunks()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for rows in stream_partitions(db, export_stmt(date_from, date_to), EXPORT_YIELD_PER):
+            for row in rows:
+                zf.writestr(f"{row.receipt_number}.html", render_receipt(row))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    yield sink.drain()
@@ -0,0 +1,105 @@
+# app/reference.py
+# In-process cache for small, rarely changing reference tables (loan types).
+#
+# Each table has a row in reference_versions whose version is bumped by a
+# statement trigger on every write (migration 4f8a2c6e9b17), whatever issues
+# it. A worker keeps one immutable snapshot per table, tagged with the
+# version it was loaded at, and serves reads from it without touching the
+# database. The scheduler polls the version every REFERENCE_POLL_INTERVAL
+# seconds and reloads on change; writes made through this worker call
+# invalidate() to see the change straight away. A lookup that misses the
+# snapshot re-checks the version once, so a type added on another worker
+# is found before the next poll.
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_POLL_INTERVAL = float(os.getenv("REFERENCE_POLL_INTERVAL", 30))
+
+
+class LoanTypeRef(NamedTuple):
+    """A loan_types row, detached and safe to share across requests."""
+    id: int
+    name: str
+    max_amount: object  # Decimal
+    max_tenure: int
+    base_interest_rate: float
+
+
+class Snapshot(NamedTuple):
+    version: int
+    items: Tuple[LoanTypeRef, ...]
+    by_id: dict
+
+
+def _version_stmt(name: str):
+    return select(models.ReferenceVersion.version).where(models.ReferenceVersion.name == name)
+
+
+class LoanTypeCache:
+    name = "loan_types"
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory or SessionLocal
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> Snapshot:
+        # Version first: a write landing in between only costs a second reload
+        version = db.execute(_version_stmt(self.name)).scalar() or 0
+        rows = db.execute(select(models.LoanType).order_by(models.LoanType.id)).scalars().all()
+        items = tuple(
+            LoanTypeRef(t.id, t.name, t.max_amount, t.max_tenure, t.base_interest_rate) for t in rows
+        )
+        return Snapshot(version, items, {t.id: t for t in items})
+
+    def snapshot(self, db: Session = None) -> Snapshot:
+        snap = self._snapshot
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snapshot is None:
+                if db is not None:
+                    self._snapshot = self._load(db)
+                else:
+                    with self._session_factory() as own:
+                        self._snapshot = self._load(own)
+            return self._snapshot
+
+    def all(self, db: Session = None):
+        return self.snapshot(db).items
+
+    def get(self, loan_type_id: int, db: Session = None) -> Optional[LoanTypeRef]:
+        found = self.snapshot(db).by_id.get(loan_type_id)
+        if found is None:
+            found = self.check(db).by_id.get(loan_type_id)
+        return found
+
+    def check(self, db: Session = None) -> Snapshot:
+        """Reload if the stored version moved on; returns the current snapshot."""
+        if db is None:
+            with self._session_factory() as own:
+                return self.check(own)
+        version = db.execute(_version_stmt(self.name)).scalar() or 0
+        snap = self._snapshot
+        if snap is None or snap.version != version:
+            with self._lock:
+                snap = self._snapshot = self._load(db)
+            logger.info("Reloaded %s reference data at version %d", self.name, snap.version)
+        return snap
+
+    def invalidate(self):
+        # Call after writing loan_types; the next read reloads
+        self._snapshot = None
+
+
+loan_types = LoanTypeCache()
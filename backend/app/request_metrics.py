@@ -0,0 +1,232 @@
+# app/request_metrics.py
+# Per-request timing: SQL query count and time, handler time and
+# serialization time, reported in a Server-Timing header and aggregated
+# into per-route histograms for GET /metrics (Prometheus text format).
+#
+#   db     - time spent executing SQL (cursor events), with the query count
+#   handler - time spent in the endpoint function itself (includes its SQL)
+#   ser    - from the endpoint returning to the response starting: response
+#            model validation, encoding and rendering
+#   total  - from the request arriving to the response starting
+#
+# Everything is per process; with several workers each exposes its own.
+import bisect
+import functools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import routing as fastapi_routing
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") != "0"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class RequestMetrics:
+    __slots__ = ("start", "queries", "db_time", "handler_time", "handler_end", "response_start")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.handler_time = 0.0
+        self.handler_end = None
+        self.response_start = None
+
+    @property
+    def serialization_time(self) -> float:
+        if self.handler_end is None or self.response_start is None:
+            return 0.0
+        return max(0.0, self.response_start - self.handler_end)
+
+    def server_timing(self) -> str:
+        total = (self.response_start or time.perf_counter()) - self.start
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f"handler;dur={self.handler_time * 1000:.1f}, "
+            f"ser;dur={self.serialization_time * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+
+
+# Set for the duration of each HTTP request. Sync endpoints run in the
+# threadpool with a copy of the context, which still points at the same
+# RequestMetrics object.
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# name -> (help, buckets); every route gets one of each
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Time from request to end of response", LATENCY_BUCKETS),
+    "http_request_db_seconds": ("Time spent executing SQL per request", LATENCY_BUCKETS),
+    "http_request_handler_seconds": ("Time spent in the endpoint function per request", LATENCY_BUCKETS),
+    "http_request_serialization_seconds": ("Time spent serializing the response per request", LATENCY_BUCKETS),
+    "http_request_queries": ("SQL queries executed per request", QUERY_BUCKETS),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (method, route) -> {name: Histogram}
+        self._requests = {}  # (method, route, status) -> count
+
+    def observe(self, method: str, route: str, status: int, duration: float, m: RequestMetrics):
+        values = {
+            "http_request_duration_seconds": duration,
+            "http_request_db_seconds": m.db_time,
+            "http_request_handler_seconds": m.handler_time,
+            "http_request_serialization_seconds": m.serialization_time,
+            "http_request_queries": m.queries,
+        }
+        with self._lock:
+            hists = self._histograms.get((method, route))
+            if hists is None:
+                hists = self._histograms[(method, route)] = {
+                    name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+                }
+            for name, value in values.items():
+                hists[name].observe(value)
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP http_requests_total HTTP requests by route and status",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            for (method, route, status), n in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+            for name, (help_text, buckets) in HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), hists in sorted(self._histograms.items()):
+                    h = hists[name]
+                    cumulative = 0
+                    for le, n in zip(buckets + ("+Inf",), h.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+                    labels = _labels(method=method, route=route)
+                    lines.append(f"{name}_sum{labels} {h.sum:.6f}")
+                    lines.append(f"{name}_count{labels} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+registry = Registry()
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so the contextvar is set in the request's own task."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        m = RequestMetrics()
+        token = _current.set(m)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                m.response_start = time.perf_counter()
+                status = message["status"]
+                if SERVER_TIMING:
+                    MutableHeaders(scope=message).append("Server-Timing", m.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # The router stores the matched route in the scope; label by its
+            # template (/loans/{loan_id}) so the label set stays bounded.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            registry.observe(scope["method"], route, status, time.perf_counter() - m.start, m)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._request_metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    m = _current.get()
+    start = getattr(context, "_request_metrics_start", None)
+    if m is not None and start is not None:
+        m.queries += 1
+        m.db_time += time.perf_counter() - start
+
+
+def instrument_engine(engine):
+    """Feed query counts and SQL time from engine (sync Engine or AsyncEngine) into the current request."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_endpoints():
+    """Time endpoint functions separately from serializing their results.
+
+    FastAPI calls every endpoint through fastapi.routing.run_endpoint_function
+    (kept separate upstream for profiling) and then serializes the return
+    value in the same route handler, so wrapping that function splits the two.
+    """
+    run_endpoint_function = fastapi_routing.run_endpoint_function
+    if getattr(run_endpoint_function, "_request_metrics_timed", False):
+        return
+
+    @functools.wraps(run_endpoint_function)
+    async def timed_run_endpoint_function(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await run_endpoint_function(*args, **kwargs)
+        finally:
+            m = _current.get()
+            if m is not None:
+                m.handler_end = time.perf_counter()
+                m.handler_time += m.handler_end - start
+
+    timed_run_endpoint_function._request_metrics_timed = True
+    fastapi_routing.run_endpoint_function = timed_run_endpoint_function
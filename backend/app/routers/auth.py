@@ -1,36 +1,70 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from ..database import get_db
-from .. import crud, schemas, auth as _auth
+from .. import audit, crud, schemas, auth as _auth
+from ..deps import invalidate_principal
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _busy():
+    return HTTPException(
+        status_code=503,
+        detail="Authentication is busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+# These handlers are async so that waiting on bcrypt (in its own process
+# pool) does not hold a threadpool thread; DB calls are pushed to the pool.
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
-    user = crud.get_user_by_username(db, form_data.username)
-    if not user or not _auth.verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(crud.get_user_by_username, db, form_data.username)
+    if not user:
+        # Not the attempted name: people often type their password into it
+        audit.record("LOGIN_FAILED", None, "Unknown username")
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        ok, new_hash = await _auth.verify_and_update_async(form_data.password, user.password_hash)
+    except _auth.HashPoolSaturated:
+        raise _busy()
+    if not ok:
+        audit.record("LOGIN_FAILED", user.id, f"Wrong password for {user.username}")
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Cost factor was raised since this hash was stored
+        await run_in_threadpool(crud.update_password_hash, db, user, new_hash)
+    audit.record("LOGIN", user.id, f"User {user.username} logged in")
     token = _auth.create_access_token({"sub": user.username, "role": user.role.value})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/signup", response_model=schemas.UserOut)
-def signup(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def signup(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if user exists
-    existing = crud.get_user_by_username(db, user_in.username)
+    existing = await run_in_threadpool(crud.get_user_by_username, db, user_in.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already taken")
 
+    try:
+        password_hash = await _auth.get_password_hash_async(user_in.password)
+    except _auth.HashPoolSaturated:
+        raise _busy()
+
     # Create user
-    new_user = crud.create_user(
+    new_user = await run_in_threadpool(
+        crud.create_user,
         db=db,
         username=user_in.username,
-        password=user_in.password,   # crud handles hashing
-        role=user_in.role            # OR hardcode "loan_officer"
+        password=None,
+        role=user_in.role,           # OR hardcode "loan_officer"
+        password_hash=password_hash,
     )
+    invalidate_principal(new_user.username)
+    audit.record("USER_CREATED", new_user.id, f"User {new_user.username} signed up as {new_user.role.value}")
 
     return new_user
@@ -1,9 +1,11 @@
 # app/routers/borrowers.py
-from fastapi import APIRouter, Depends, HTTPException
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from ..database import get_db
-from .. import schemas, crud
-from ..deps import require_roles
+from ..database import get_db, get_read_db
+from .. import schemas, crud, crud_async, portfolio
+from ..deps import require_roles, run_read
 
 router = APIRouter(prefix="/borrowers", tags=["borrowers"])
 
@@ -23,8 +25,84 @@ def create_borrower(b_in: schemas.BorrowerCreate, db: Session = Depends(get_db))
     response_model=list[schemas.BorrowerOut],
     dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
 )
-def list_borrowers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.list_borrowers(db, skip, limit)
+async def list_borrowers(skip: int = 0, limit: int = 100, db=Depends(get_read_db)):
+    return await run_read(db, crud.list_borrowers, crud_async.list_borrowers, skip, limit)
+
+
+@router.get(
+    "/search",
+    response_model=schemas.BorrowerPage,
+    dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
+)
+async def search_borrowers(
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    mode: str = "prefix",
+    credit_min: Optional[int] = None,
+    credit_max: Optional[int] = None,
+    income_min: Optional[Decimal] = None,
+    income_max: Optional[Decimal] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db=Depends(get_read_db),
+):
+    """Name search for autocomplete (mode=prefix) or typo-tolerant lookup (mode=fuzzy).
+
+    Follow next_cursor for more; a cursor is only valid with the same q and mode.
+    """
+    if mode not in crud.BORROWER_SEARCH_MODES:
+        raise HTTPException(400, f"mode must be one of {', '.join(crud.BORROWER_SEARCH_MODES)}")
+    q = q.strip() if q else None
+    borrowers, next_cursor = await run_read(
+        db,
+        crud.search_borrowers,
+        crud_async.search_borrowers,
+        q=q,
+        mode=mode,
+        credit_min=credit_min,
+        credit_max=credit_max,
+        income_min=income_min,
+        income_max=income_max,
+        cursor=cursor,
+        limit=limit,
+    )
+    return {"items": borrowers, "next_cursor": next_cursor}
+
+
+@router.get(
+    "/portfolio",
+    response_model=schemas.PortfolioPage,
+    dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
+)
+async def list_borrower_portfolios(
+    sort: str = "exposure",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db=Depends(get_read_db),
+):
+    """Per-borrower loan totals from the materialized view; see refreshed_at for staleness."""
+    if sort not in portfolio.PORTFOLIO_SORTS:
+        raise HTTPException(400, f"sort must be one of {', '.join(portfolio.PORTFOLIO_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(400, "order must be asc or desc")
+    items, next_cursor, refreshed_at = await run_read(
+        db, portfolio.list_portfolio, crud_async.list_portfolio, sort, order, cursor, limit
+    )
+    return {"items": items, "next_cursor": next_cursor, **portfolio.staleness(refreshed_at)}
+
+
+@router.get(
+    "/{borrower_id}/portfolio",
+    response_model=schemas.BorrowerPortfolioDetail,
+    dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
+)
+async def get_borrower_portfolio(borrower_id: int, db=Depends(get_read_db)):
+    row, refreshed_at = await run_read(
+        db, portfolio.get_borrower_portfolio, crud_async.get_borrower_portfolio, borrower_id
+    )
+    if not row:
+        raise HTTPException(404, "Borrower not found")
+    return {**row, **portfolio.staleness(refreshed_at)}
 
 
 @router.get(
@@ -32,8 +110,8 @@ def list_borrowers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db
     response_model=schemas.BorrowerOut,
     dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
 )
-def get_borrower(borrower_id: int, db: Session = Depends(get_db)):
-    b = crud.get_borrower(db, borrower_id)
+async def get_borrower(borrower_id: int, db=Depends(get_read_db)):
+    b = await run_read(db, crud.get_borrower, crud_async.get_borrower, borrower_id)
     if not b:
         raise HTTPException(404, "Borrower not found")
     return b
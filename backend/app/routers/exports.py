@@ -0,0 +1,93 @@
+# app/routers/exports.py
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..database import get_db
+from .. import models, exports
+from ..deps import require_roles
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["exports"],
+    dependencies=[Depends(require_roles("admin", "accountant"))],
+)
+
+
+def _respond(db: Session, stmt, name: str, fmt: str, date_from: Optional[date], date_to: Optional[date]):
+    if fmt not in exports.EXPORT_FORMATS:
+        raise HTTPException(400, f"format must be one of {', '.join(exports.EXPORT_FORMATS)}")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(400, "from must be on or before to")
+    filename = f"{name}_{date_from or 'start'}_{date_to or 'end'}.{fmt}"
+    return StreamingResponse(
+        exports.iter_export(db, stmt, fmt),
+        media_type=exports.EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/loans")
+def export_loans(
+    format: str = "csv",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    status: Optional[models.LoanStatus] = None,
+    db: Session = Depends(get_db),
+):
+    """Loans created between from and to, with the borrower's name."""
+    Loan = models.Loan
+    stmt = (
+        select(
+            Loan.id, Loan.borrower_id, models.Borrower.name.label("borrower_name"),
+            Loan.loan_type_id, Loan.principal, Loan.interest_rate, Loan.term_months,
+            Loan.status, Loan.outstanding, Loan.disbursed_on, Loan.created_at,
+        )
+        .join(models.Borrower, models.Borrower.id == Loan.borrower_id)
+        .order_by(Loan.id)
+    )
+    if status:
+        stmt = stmt.where(Loan.status == status)
+    stmt = exports.date_range(stmt, Loan.created_at, date_from, date_to)
+    return _respond(db, stmt, "loans", format, date_from, date_to)
+
+
+@router.get("/repayments")
+def export_repayments(
+    format: str = "csv",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Repayments due between from and to."""
+    Repayment = models.Repayment
+    stmt = select(
+        Repayment.id, Repayment.loan_id, Repayment.due_date, Repayment.amount,
+        Repayment.paid_amount, Repayment.paid_on, Repayment.status,
+    ).order_by(Repayment.id)
+    if status:
+        stmt = stmt.where(Repayment.status == status)
+    stmt = exports.date_range(stmt, Repayment.due_date, date_from, date_to)
+    return _respond(db, stmt, "repayments", format, date_from, date_to)
+
+
+@router.get("/ledger")
+def export_ledger(
+    format: str = "csv",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    type: Optional[str] = Query(None, description="disbursement, repayment or penalty"),
+    db: Session = Depends(get_db),
+):
+    """Ledger entries dated between from and to."""
+    Ledger = models.Ledger
+    stmt = select(
+        Ledger.id, Ledger.loan_id, Ledger.type, Ledger.amount, Ledger.date, Ledger.balance_after,
+    ).order_by(Ledger.id)
+    if type:
+        stmt = stmt.where(Ledger.type == type)
+    stmt = exports.date_range(stmt, Ledger.date, date_from, date_to)
+    return _respond(db, stmt, "ledger", format, date_from, date_to)
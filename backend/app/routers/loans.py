@@ -4,37 +4,77 @@ import logging
 from typing import List, Optional
 
 logger = logging.getLogger(__name__)
-from decimal import Decimal, ROUND_HALF_UP, getcontext
-from dateutil.relativedelta import relativedelta
 from datetime import datetime
 from fastapi import status
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import case, insert, update
 from sqlalchemy.orm import Session
-from ..database import get_db
-from .. import schemas, models, crud
-from ..deps import require_roles, get_current_user
+from ..database import get_db, get_read_db
+from pydantic import TypeAdapter
+from .. import audit, etags, responses, schemas, models, crud, crud_async, amortization, reference, schedule
+from ..deps import require_roles, get_current_user, run_read
+from .reports import invalidate_dashboard_stats
 
 router = APIRouter(prefix="/loans", tags=["loans"])
 
+_LOAN_PAGE = TypeAdapter(schemas.LoanPage)
+_LOAN_SUMMARIES = TypeAdapter(List[schemas.LoanSummaryOut])
 
-# helper: amortization EMI function (monthly)
-def compute_monthly_emi(
-    principal: Decimal, annual_rate: float, term_months: int
-) -> Decimal:
-    # Use decimal for accuracy
-    getcontext().prec = 28
-    P = Decimal(principal)
-    r = Decimal(annual_rate) / Decimal(12 * 100)  # monthly rate
-    n = Decimal(term_months)
-    if r == 0:
-        return (P / n).quantize(Decimal("0.01"))
-    # EMI formula: E = P * r * (1+r)^n / ((1+r)^n - 1)
-    one_plus_r_pow_n = (1 + r) ** n
-    E = P * r * one_plus_r_pow_n / (one_plus_r_pow_n - 1)
-    return E.quantize(Decimal("0.01"))
 
+def disburse_loans(db: Session, loans):
+    """Activate pending loans and write their ledger and repayment rows.
 
-from dateutil.relativedelta import relativedelta
+    Set-based: one UPDATE for the loans, one multi-row INSERT each for the
+    ledger and the repayment schedule. Caller owns locking and the commit.
+    In windowed mode long loans only get the first installments (app/schedule.py).
+    """
+    if not loans:
+        return
+    now = datetime.utcnow()
+    ids = [loan.id for loan in loans]
+    values = dict(
+        status=models.LoanStatus.active,
+        disbursed_on=now,
+        outstanding=models.Loan.principal,
+        version=models.Loan.version + 1,
+    )
+    if schedule.SCHEDULE_MODE == "windowed":
+        long_term = models.Loan.term_months > schedule.SCHEDULE_WINDOW
+        values["schedule_mode"] = case((long_term, "windowed"), else_="full")
+        values["installments_materialized"] = case((long_term, schedule.SCHEDULE_WINDOW), else_=None)
+    db.execute(
+        update(models.Loan)
+        .where(models.Loan.id.in_(ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+    plan = amortization.amortize(
+        [loan.principal for loan in loans],
+        [loan.interest_rate for loan in loans],
+        [loan.term_months for loan in loans],
+    )
+    ledger_rows = []
+    repayment_rows = []
+    for k, loan in enumerate(loans):
+        # Initial balance is the loan amount (debt)
+        ledger_rows.append(
+            {
+                "loan_id": loan.id,
+                "type": "disbursement",
+                "amount": loan.principal,
+                "balance_after": loan.principal,
+            }
+        )
+        repayment_rows.extend(
+            schedule.installment_rows(loan.id, plan, k, now, 0, schedule.initial_count(loan.term_months))
+        )
+    db.execute(insert(models.Ledger), ledger_rows)
+    if repayment_rows:
+        db.execute(insert(models.Repayment), repayment_rows)
+    # The bulk UPDATE bypassed the identity map
+    for loan in loans:
+        db.expire(loan)
 
 
 @router.post(
@@ -42,14 +82,14 @@ from dateutil.relativedelta import relativedelta
     response_model=schemas.LoanOut,
     dependencies=[Depends(require_roles("admin", "loan_officer"))],
 )
-def apply_loan(loan_in: schemas.LoanCreate, db: Session = Depends(get_db)):
+def apply_loan(loan_in: schemas.LoanCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     borrower = crud.get_borrower(db, loan_in.borrower_id)
     if not borrower:
         raise HTTPException(404, "Borrower not found")
     
     # Validate Loan Type if provided
     if loan_in.loan_type_id:
-        loan_type = db.query(models.LoanType).filter(models.LoanType.id == loan_in.loan_type_id).first()
+        loan_type = reference.loan_types.get(loan_in.loan_type_id, db)
         if not loan_type:
             raise HTTPException(404, "Loan Type not found")
         
@@ -75,8 +115,13 @@ def apply_loan(loan_in: schemas.LoanCreate, db: Session = Depends(get_db)):
             db.add(collateral)
     
     db.commit()
-    db.refresh(loan)
-    return loan
+    invalidate_dashboard_stats()
+    audit.record(
+        "LOAN_CREATED",
+        current_user.id,
+        f"Loan ID {loan.id} created for borrower {borrower.name} - Amount: {loan_in.principal}",
+    )
+    return crud.get_loan(db, loan.id, shape="detail")
 
 
 @router.post(
@@ -84,7 +129,7 @@ def apply_loan(loan_in: schemas.LoanCreate, db: Session = Depends(get_db)):
     response_model=schemas.LoanOut,
     dependencies=[Depends(require_roles("admin", "loan_officer"))],
 )
-def approve_loan(loan_id: int, db: Session = Depends(get_db)):
+def approve_loan(loan_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     loan = crud.get_loan(db, loan_id)
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
@@ -92,91 +137,188 @@ def approve_loan(loan_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Loan not in pending state")
 
     try:
-        # prepare decimal precision
-        getcontext().prec = 28
-
-        # set disbursement fields
-        loan.status = models.LoanStatus.active
-        loan.disbursed_on = datetime.utcnow()
-        loan.outstanding = loan.principal
-        db.add(loan)
-        db.flush()  # ensure loan.id is available for repayment rows
-
-        # Create Ledger Entry for Disbursement
-        ledger_entry = models.Ledger(
-            loan_id=loan.id,
-            type="disbursement",
-            amount=loan.principal,
-            balance_after=loan.principal # Initial balance is the loan amount (debt)
+        disburse_loans(db, [loan])
+        db.commit()
+        invalidate_dashboard_stats()
+        audit.record("LOAN_APPROVED", current_user.id, f"Loan ID {loan_id} approved and disbursed")
+        return crud.get_loan(db, loan.id, shape="detail")
+
+    except Exception as exc:
+        logger.exception("Error approving loan %s", loan_id)
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Approve failed: {str(exc)}",
         )
-        db.add(ledger_entry)
 
-        P = Decimal(loan.principal)
-        monthly_rate = Decimal(loan.interest_rate) / Decimal(12 * 100)
-        n = int(loan.term_months)
 
-        # compute EMI
-        if monthly_rate == 0:
-            emi = (P / Decimal(n)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        else:
-            one_plus_r_pow_n = (1 + monthly_rate) ** n
-            emi = (
-                P * monthly_rate * one_plus_r_pow_n / (one_plus_r_pow_n - 1)
-            ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-        balance = P
-        due_date = loan.disbursed_on
-        for i in range(1, n + 1):
-            interest = (balance * monthly_rate).quantize(
-                Decimal("0.01"), rounding=ROUND_HALF_UP
-            )
-            principal_component = (emi - interest).quantize(
-                Decimal("0.01"), rounding=ROUND_HALF_UP
-            )
-            if i == n:
-                principal_component = balance
-                payment = (principal_component + interest).quantize(
-                    Decimal("0.01"), rounding=ROUND_HALF_UP
-                )
-            else:
-                payment = emi
-                balance = (balance - principal_component).quantize(
-                    Decimal("0.01"), rounding=ROUND_HALF_UP
-                )
-
-            due_date = due_date + relativedelta(months=+1)
-            rp = models.Repayment(
-                loan_id=loan.id,
-                due_date=due_date,
-                amount=payment,
-                paid_amount=Decimal("0.00"),
-                status="due",
-            )
-            db.add(rp)
 
-        db.commit()
-        db.refresh(loan)
-        return loan
 
+MAX_SIMULATION_SCENARIOS = 1000
+
+
+@router.post(
+    "/simulate",
+    response_model=List[schemas.LoanSimulationOut],
+    dependencies=[Depends(require_roles("admin", "loan_officer"))],
+)
+def simulate_loans(req: schemas.LoanSimulationRequest):
+    grid = [
+        (p, r, n)
+        for p in req.principals
+        for r in req.interest_rates
+        for n in req.term_months
+    ]
+    if not grid:
+        raise HTTPException(400, "Give at least one principal, rate and tenure")
+    if len(grid) > MAX_SIMULATION_SCENARIOS:
+        raise HTTPException(400, f"At most {MAX_SIMULATION_SCENARIOS} scenarios per call")
+    try:
+        schedule = amortization.amortize(*zip(*grid))
+    except ValueError as e:
+        # Out of the engine's range (amortization.check_bounds)
+        raise HTTPException(400, str(e))
+    total_interest = schedule.interest.sum(axis=1)
+    results = []
+    for k, (p, r, n) in enumerate(grid):
+        out = {
+            "principal": p,
+            "interest_rate": r,
+            "term_months": n,
+            "emi": amortization.cents_to_decimal(schedule.emi[k]),
+            "total_interest": amortization.cents_to_decimal(total_interest[k]),
+            "total_payable": amortization.cents_to_decimal(schedule.payment[k].sum()),
+            "schedule": [],
+        }
+        if req.include_schedule:
+            out["schedule"] = [
+                {
+                    "installment": i,
+                    "payment": payment,
+                    "interest": interest,
+                    "principal": principal,
+                    "balance_after": balance,
+                }
+                for i, payment, interest, principal, balance in schedule.installments(k)
+            ]
+        results.append(out)
+    return results
+
+
+MAX_APPROVE_BATCH = 1000
+
+
+@router.post(
+    "/approve-batch",
+    response_model=schemas.LoanBatchApproveOut,
+    dependencies=[Depends(require_roles("admin", "loan_officer"))],
+)
+def approve_loans_batch(
+    batch: schemas.LoanBatchApprove,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    loan_ids = sorted(set(batch.loan_ids))
+    if not loan_ids:
+        raise HTTPException(400, "No loan ids given")
+    if len(loan_ids) > MAX_APPROVE_BATCH:
+        raise HTTPException(400, f"At most {MAX_APPROVE_BATCH} loans per batch")
+
+    # Loans another transaction is approving are skipped, not waited on.
+    locked = (
+        db.query(models.Loan)
+        .filter(
+            models.Loan.id.in_(loan_ids),
+            models.Loan.status == models.LoanStatus.pending,
+        )
+        .order_by(models.Loan.id)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    locked_ids = {loan.id for loan in locked}
+    # Read after the lock so a loan approved or locked elsewhere in the
+    # meantime is reported as it is now
+    skipped = [loan_id for loan_id in loan_ids if loan_id not in locked_ids]
+    known = dict(
+        db.query(models.Loan.id, models.Loan.status)
+        .filter(models.Loan.id.in_(skipped))
+        .all()
+    ) if skipped else {}
+
+    try:
+        disburse_loans(db, locked)
+        db.commit()
+        invalidate_dashboard_stats()
+        for loan_id in sorted(locked_ids):
+            audit.record("LOAN_APPROVED", current_user.id, f"Loan ID {loan_id} approved and disbursed (batch)")
     except Exception as exc:
-        logger.exception("Error approving loan %s", loan_id)
+        logger.exception("Error approving loan batch %s", loan_ids)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Approve failed: {str(exc)}",
         )
 
+    results = []
+    for loan_id in loan_ids:
+        if loan_id in locked_ids:
+            results.append({"loan_id": loan_id, "outcome": "approved"})
+        elif loan_id not in known:
+            results.append({"loan_id": loan_id, "outcome": "not_found", "detail": "Loan not found"})
+        elif known[loan_id] != models.LoanStatus.pending:
+            results.append({"loan_id": loan_id, "outcome": "not_pending", "detail": "Loan not in pending state"})
+        else:
+            results.append({"loan_id": loan_id, "outcome": "locked", "detail": "Loan is being processed by another request"})
+    return {"results": results}
 
 
+@router.get(
+    "/",
+    response_model=schemas.LoanPage,
+    dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
+)
+async def list_loans(
+    status: Optional[models.LoanStatus] = None,
+    borrower_id: Optional[int] = None,
+    loan_type_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db=Depends(get_read_db),
+):
+    loans, next_cursor = await run_read(
+        db,
+        crud.list_loans,
+        crud_async.list_loans,
+        status=status,
+        borrower_id=borrower_id,
+        loan_type_id=loan_type_id,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+        limit=limit,
+    )
+    return responses.model_response(_LOAN_PAGE, {"items": loans, "next_cursor": next_cursor})
+
 
 @router.get(
     "/get_all_loans",
-    response_model=List[schemas.LoanOut],  # FastAPI uses this to filter/map data
+    response_model=List[schemas.LoanSummaryOut],
     dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
 )
-def get_all_loans(db: Session = Depends(get_db)):
-    # Just return the query result directly!
-    return db.query(models.Loan).all()
+async def get_all_loans(
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=500),
+    db=Depends(get_read_db),
+):
+    # Compatibility wrapper over the keyset listing: same list shape as before,
+    # but capped per call. Clients follow X-Next-Cursor for the rest.
+    loans, next_cursor = await run_read(
+        db, crud.list_loans, crud_async.list_loans, cursor=cursor, limit=limit
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return responses.model_response(_LOAN_SUMMARIES, loans, headers=headers)
 
 
 @router.get(
@@ -184,16 +326,32 @@ def get_all_loans(db: Session = Depends(get_db)):
     response_model=List[schemas.LoanTypeOut],
     dependencies=[Depends(require_roles("admin", "loan_officer"))],
 )
-def get_loan_types(db: Session = Depends(get_db)):
-    return db.query(models.LoanType).all()
+def get_loan_types():
+    # Served from the reference cache; only the first call per worker loads it
+    return reference.loan_types.all()
 
 @router.get(
     "/{loan_id}",
     response_model=schemas.LoanOut,
     dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))],
 )
-def get_loan(loan_id: int, db: Session = Depends(get_db)):
-    loan = crud.get_loan(db, loan_id)
+async def get_loan(
+    loan_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_read_db),
+):
+    # One primary-key lookup, no object graph. Read before the detail, so
+    # the body is never older than its tag
+    versions = await run_read(db, crud.get_loan_detail_versions, crud_async.get_loan_detail_versions, loan_id)
+    if versions is None:
+        raise HTTPException(404, "Loan not found")
+    # The detail embeds the loan type, which changes independently of the loan
+    etag = etags.weak_etag(*versions)
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    loan = await run_read(db, crud.get_loan, crud_async.get_loan, loan_id, shape="detail")
     if not loan:
         raise HTTPException(404, "Loan not found")
+    etags.set_headers(response, etag)
     return loan
@@ -0,0 +1,54 @@
+# app/routers/metrics.py
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from .. import audit, database, request_metrics
+from ..deps import require_roles
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+# Prometheus scrapes can't log in, so /metrics takes a static bearer token
+# instead of a user session. Unset means the endpoint is off.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def _check_metrics_token(authorization: str = Header(None)):
+    if not METRICS_TOKEN:
+        raise HTTPException(404, "Not Found")
+    if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(401, "Invalid metrics token")
+
+
+@router.get("", response_class=PlainTextResponse, dependencies=[Depends(_check_metrics_token)])
+def get_prometheus_metrics():
+    return PlainTextResponse(
+        request_metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/db-pool", dependencies=[Depends(require_roles("admin"))])
+def get_db_pool_metrics():
+    pools = {"sync": database.engine_pool_stats.snapshot(database.engine.pool)}
+    if database.ASYNC_DB:
+        pools["async"] = database.async_engine_pool_stats.snapshot(
+            database.async_engine.sync_engine.pool
+        )
+    return {
+        "config": {
+            "pool_size": database.DB_POOL_SIZE,
+            "max_overflow": database.DB_MAX_OVERFLOW,
+            "pool_timeout": database.DB_POOL_TIMEOUT,
+            "pool_recycle": database.DB_POOL_RECYCLE,
+            "pool_pre_ping": database.DB_POOL_PRE_PING,
+            "statement_timeout_ms": database.DB_STATEMENT_TIMEOUT_MS,
+            "idle_in_transaction_session_timeout_ms": database.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS,
+        },
+        "pools": pools,
+    }
+
+
+@router.get("/audit", dependencies=[Depends(require_roles("admin"))])
+def get_audit_writer_metrics():
+    return audit.writer.stats()
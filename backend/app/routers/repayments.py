@@ -1,147 +1,233 @@
 # app/routers/repayments.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, exists, insert, literal, select, update
 from sqlalchemy.orm import Session
-from ..database import get_db
-from .. import schemas, models
-from ..deps import require_roles, get_current_user
+from ..database import get_db, get_read_db
+from .. import audit, etags, responses, schemas, models, crud, crud_async, ingest, receipts
+from ..deps import require_roles, get_current_user, run_read
+from .reports import invalidate_dashboard_stats
 from decimal import Decimal
-from datetime import datetime
-from fastapi.responses import HTMLResponse
+from datetime import date, datetime
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import TypeAdapter
 import uuid
 
 router = APIRouter(prefix="/repayments", tags=["repayments"])
 
+_OVERDUE_PAGE = TypeAdapter(schemas.OverduePage)
+_REPAYMENTS = TypeAdapter(list[schemas.RepaymentOut])
+
+
+_INGEST_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+@router.post("/ingest", response_model=schemas.IngestReport, dependencies=[Depends(require_roles("admin","accountant"))])
+async def ingest_payments(
+    request: Request,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Apply a settlement file of (repayment_id, amount, paid_on) lines.
+
+    The body is a CSV file with a header row or NDJSON, picked by ?format=
+    or the Content-Type. It is read as a stream and applied in chunks, one
+    transaction per chunk, so a failed chunk does not undo earlier ones.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fmt = format or _INGEST_CONTENT_TYPES.get(content_type)
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(415, "Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+    parser = ingest.LineParser(fmt)
+    results, pending = [], []
+
+    async def apply(items):
+        chunk = await run_in_threadpool(ingest.apply_chunk_safely, db, items)
+        applied = [r["repayment_id"] for r in chunk if r["status"] == "applied"]
+        if applied:
+            audit.record(
+                "PAYMENTS_INGESTED",
+                current_user.id,
+                f"Applied {len(applied)} payments from settlement file lines "
+                f"{items[0][0]}-{items[-1][0]} (repayment IDs {min(applied)}-{max(applied)})",
+            )
+        results.extend(chunk)
+
+    async for line in ingest.iter_lines(request.stream()):
+        try:
+            parsed = parser.feed(line)
+        except ingest.FileError as e:
+            # Header problems come before any record, so nothing is applied yet
+            raise HTTPException(400, str(e))
+        if parsed is None:
+            continue
+        line_no, record, error = parsed
+        if error:
+            results.append({"line": line_no, "status": "rejected", "detail": error})
+            continue
+        pending.append((line_no, record))
+        if len(pending) >= ingest.INGEST_CHUNK_SIZE:
+            await apply(pending)
+            pending = []
+    if pending:
+        await apply(pending)
+
+    results.sort(key=lambda r: r["line"])
+    invalidate_dashboard_stats()
+    counts = {"applied": 0, "rejected": 0, "error": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    return {
+        "lines": len(results),
+        "applied": counts["applied"],
+        "rejected": counts["rejected"],
+        "errors": counts["error"],
+        "results": results,
+    }
+
+
 @router.post("/{repayment_id}/pay", response_model=schemas.RepaymentOut, dependencies=[Depends(require_roles("admin","accountant"))])
-def pay_repayment(repayment_id: int, payment: schemas.RepaymentCreate, db: Session = Depends(get_db)):
-    rp = db.query(models.Repayment).filter(models.Repayment.id == repayment_id).first()
-    if not rp:
-        raise HTTPException(404, "Repayment not found")
-    loan = rp.loan
-    pay_amount = Decimal(payment.paid_amount)
+def pay_repayment(
+    repayment_id: int,
+    payment: schemas.RepaymentCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    pay_amount = Decimal(payment.paid_amount).quantize(Decimal('0.01'))
     if pay_amount <= 0:
         raise HTTPException(400, "Payment must be > 0")
-    # Update paid_amount and status
-    rp.paid_amount = (Decimal(rp.paid_amount) + pay_amount).quantize(Decimal('0.01'))
-    rp.paid_on = datetime.utcnow()
-    if rp.paid_amount >= Decimal(rp.amount):
-        rp.status = "paid"
-    else:
-        rp.status = "partial"
-    db.add(rp)
-    # Update loan outstanding
-    # decrement outstanding by applied principal portion.
-    # If repayment amount > scheduled amount we apply extra to loan outstanding
-    extra = Decimal('0.00')
-    if rp.paid_amount > Decimal(rp.amount):
-        extra = rp.paid_amount - Decimal(rp.amount)
-    # ideal principal reduction: min(paid_amount, rp.amount) - interest_component
-    # For simplicity we reduce outstanding by paid_amount (this assumes rp.amount includes interest+principal)
-    loan.outstanding = (Decimal(loan.outstanding) - pay_amount).quantize(Decimal('0.01'))
-    if loan.outstanding <= 0:
-        loan.status = models.LoanStatus.closed
-        loan.outstanding = Decimal('0.00')
-    db.add(loan)
-    db.commit()
-    db.refresh(rp)
-
-    # Generate Receipt
-    if rp.status == "paid" or rp.status == "partial": # Generate receipt for any payment
-        # Simple receipt number generation
-        rec_num = f"REC-{int(datetime.utcnow().timestamp())}-{rp.id}"
-        receipt = models.Receipt(repayment_id=rp.id, receipt_number=rec_num)
-        db.add(receipt)
-        
-        # Ledger Entry for Repayment
-        ledger_entry = models.Ledger(
+    now = datetime.utcnow()
+
+    # Each balance moves with a single UPDATE ... RETURNING computed by the
+    # database, so concurrent payers on the same loan cannot overwrite each
+    # other's result. The loan row is locked before the repayment row, the
+    # same order payment-file ingest uses, and both are held only until the
+    # commit below.
+    Repayment, Loan = models.Repayment, models.Loan
+    # Reduce outstanding by the full payment (rp.amount includes interest +
+    # principal); the loan closes in the same statement once it hits zero.
+    remaining = Loan.outstanding - pay_amount
+    loan = db.execute(
+        update(Loan)
+        .where(Loan.id == select(Repayment.loan_id).where(Repayment.id == repayment_id).scalar_subquery())
+        .values(
+            outstanding=case((remaining <= 0, Decimal('0.00')), else_=remaining),
+            status=case((remaining <= 0, literal(models.LoanStatus.closed, Loan.status.type)), else_=Loan.status),
+            version=Loan.version + 1,
+        )
+        .returning(Loan.id, Loan.outstanding)
+    ).first()
+    if not loan:
+        raise HTTPException(404, "Repayment not found")
+
+    new_paid = Repayment.paid_amount + pay_amount
+    rp = db.execute(
+        update(Repayment)
+        .where(Repayment.id == repayment_id)
+        .values(
+            paid_amount=new_paid,
+            paid_on=now,
+            status=case((new_paid >= Repayment.amount, "paid"), else_="partial"),
+        )
+        .returning(
+            Repayment.id, Repayment.loan_id, Repayment.due_date, Repayment.amount,
+            Repayment.paid_amount, Repayment.paid_on, Repayment.status,
+        )
+    ).one()
+
+    # Generate Receipt for the first payment on this installment
+    # (receipts.repayment_id is unique)
+    rec_num = f"REC-{int(now.timestamp())}-{rp.id}"
+    db.execute(
+        insert(models.Receipt).from_select(
+            ["repayment_id", "receipt_number"],
+            select(literal(rp.id), literal(rec_num)).where(
+                ~exists().where(models.Receipt.repayment_id == rp.id)
+            ),
+        )
+    )
+    # Ledger Entry for Repayment
+    db.execute(
+        insert(models.Ledger).values(
             loan_id=loan.id,
             type="repayment",
             amount=pay_amount,
-            date=datetime.utcnow(),
-            balance_after=loan.outstanding
+            date=now,
+            balance_after=loan.outstanding,
         )
-        db.add(ledger_entry)
-        
-        db.commit()
+    )
+    db.commit()
+
+    invalidate_dashboard_stats()
+    audit.record(
+        "REPAYMENT_RECORDED",
+        current_user.id,
+        f"Payment of {pay_amount} received for repayment ID {rp.id} (loan ID {loan.id})",
+    )
+    return rp._mapping
+
+@router.get("/overdue", response_model=schemas.OverduePage, dependencies=[Depends(require_roles("admin","loan_officer","accountant"))])
+async def list_overdue_repayments(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db=Depends(get_read_db),
+):
+    """Unpaid installments past their due date, oldest first (v_overdue_repayments shape)."""
+    items, next_cursor = await run_read(
+        db, crud.list_overdue_repayments, crud_async.list_overdue_repayments, cursor=cursor, limit=limit
+    )
+    return responses.model_response(_OVERDUE_PAGE, {"items": items, "next_cursor": next_cursor})
 
-    return rp
 
 @router.get("/loan/{loan_id}", response_model=list[schemas.RepaymentOut], dependencies=[Depends(require_roles("admin","loan_officer","accountant"))])
-def list_repayments_for_loan(loan_id: int, db: Session = Depends(get_db)):
-    rps = db.query(models.Repayment).filter(models.Repayment.loan_id == loan_id).order_by(models.Repayment.due_date).all()
-    return rps
+async def list_repayments_for_loan(
+    loan_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_read_db),
+):
+    # The version is read before the schedule, so the body is never older than its tag
+    version = await run_read(db, crud.get_loan_version, crud_async.get_loan_version, loan_id)
+    if version is None:
+        return []
+    etag = etags.weak_etag(version)
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    rows = await run_read(db, crud.list_repayments_for_loan, crud_async.list_repayments_for_loan, loan_id)
+    response = responses.model_response(_REPAYMENTS, rows)
+    etags.set_headers(response, etag)
+    return response
+
+@router.get("/receipts/export", dependencies=[Depends(require_roles("admin","accountant"))])
+def export_receipts(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Zip archive of every receipt issued between from and to (inclusive), streamed."""
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(400, "from must be on or before to")
+    name = f"receipts_{date_from or 'start'}_{date_to or 'end'}.zip"
+    return StreamingResponse(
+        receipts.iter_receipts_zip(db, date_from, date_to),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
 
 @router.get("/{repayment_id}/receipt", response_class=HTMLResponse)
 def get_repayment_receipt(repayment_id: int, db: Session = Depends(get_db)):
-    rp = db.query(models.Repayment).filter(models.Repayment.id == repayment_id).first()
-    if not rp:
+    row = receipts.get_receipt_row(db, repayment_id)
+    if not row:
         raise HTTPException(404, "Repayment not found")
-    
-    if not rp.receipt:
-        # If paid but no receipt (legacy or error), generate one
-        if rp.paid_amount > 0:
-             rec_num = f"REC-{int(datetime.utcnow().timestamp())}-{rp.id}"
-             receipt = models.Receipt(repayment_id=rp.id, receipt_number=rec_num)
-             db.add(receipt)
-             db.commit()
-             db.refresh(rp)
-        else:
-            raise HTTPException(400, "No receipt available for unpaid repayment")
-
-    receipt = rp.receipt
-    borrower = rp.loan.borrower
-    
-    html_content = f"""
-    <html>
-        <head>
-            <title>Receipt {receipt.receipt_number}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; padding: 40px; max_width: 800px; margin: 0 auto; }}
-                .header {{ text-align: center; margin-bottom: 40px; }}
-                .details {{ margin-bottom: 30px; }}
-                .row {{ display: flex; justify-content: space-between; margin-bottom: 10px; border-bottom: 1px solid #eee; padding-bottom: 5px; }}
-                .label {{ font-weight: bold; }}
-                .footer {{ margin-top: 50px; text-align: center; font-size: 0.8em; color: #666; }}
-                @media print {{
-                    body {{ padding: 0; }}
-                    .no-print {{ display: none; }}
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Payment Receipt</h1>
-                <p>Receipt #: {receipt.receipt_number}</p>
-                <p>Date: {receipt.created_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
-            </div>
-            
-            <div class="details">
-                <div class="row">
-                    <span class="label">Borrower Name:</span>
-                    <span>{borrower.name}</span>
-                </div>
-                <div class="row">
-                    <span class="label">Loan ID:</span>
-                    <span>{rp.loan_id}</span>
-                </div>
-                <div class="row">
-                    <span class="label">Repayment ID:</span>
-                    <span>{rp.id}</span>
-                </div>
-                <div class="row">
-                    <span class="label">Amount Paid:</span>
-                    <span>{rp.paid_amount}</span>
-                </div>
-                 <div class="row">
-                    <span class="label">Payment Date:</span>
-                    <span>{rp.paid_on.strftime('%Y-%m-%d') if rp.paid_on else 'N/A'}</span>
-                </div>
-            </div>
-
-            <div class="footer">
-                <p>Thank you for your payment.</p>
-                <button class="no-print" onclick="window.print()" style="padding: 10px 20px; cursor: pointer; background: #007bff; color: white; border: none; border-radius: 5px;">Print Receipt</button>
-            </div>
-        </body>
-    </html>
-    """
-    return html_content
+    if row.receipt_id is None:
+        # Receipts are issued when a payment is applied, never on read
+        raise HTTPException(400, "No receipt available for unpaid repayment")
+    return receipts.cached_receipt(row)
@@ -1,39 +1,88 @@
+import os
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from ..database import get_db, get_read_db
 from .. import models, schemas
-from ..deps import require_roles
+from ..cache import TTLCache
+from ..deps import require_roles, run_read
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
-@router.get("/dashboard-stats", dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))])
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    # Basic counts
-    total_borrowers = db.query(models.Borrower).count()
-    total_loans = db.query(models.Loan).count()
-    
-    # Financials
-    active_loans = db.query(models.Loan).filter(models.Loan.status == models.LoanStatus.active).all()
-    total_active_principal = sum(l.principal for l in active_loans)
-    total_outstanding = sum(l.outstanding for l in active_loans)
-    
-    # Loan Status Distribution
-    status_counts = db.query(models.Loan.status, func.count(models.Loan.status)).group_by(models.Loan.status).all()
-    status_dist = {s.value: c for s, c in status_counts}
-    
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", 30))
+_dashboard_cache = TTLCache(maxsize=1, ttl=DASHBOARD_CACHE_TTL)
+
+
+def invalidate_dashboard_stats():
+    # Called after commits that move money or loan status
+    _dashboard_cache.clear()
+
+
+def _dashboard_totals_stmt():
+    Loan = models.Loan
+    active = Loan.status == models.LoanStatus.active
+
+    # Counts, financials and the status distribution in one statement
+    status_columns = [
+        func.count(Loan.id).filter(Loan.status == s).label(s.value)
+        for s in models.LoanStatus
+    ]
+    return select(
+        select(func.count(models.Borrower.id)).scalar_subquery().label("total_borrowers"),
+        func.count(Loan.id).label("total_loans"),
+        func.coalesce(func.sum(Loan.principal).filter(active), 0).label("total_active_principal"),
+        func.coalesce(func.sum(Loan.outstanding).filter(active), 0).label("total_outstanding"),
+        *status_columns,
+    ).select_from(Loan)
+
+
+def _recent_repayments_stmt():
     # Recent Repayments (for chart)
     # Get last 7 days of repayments (simplified to last 10 records for demo)
-    recent_repayments = db.query(models.Repayment).filter(models.Repayment.status == "paid").order_by(models.Repayment.paid_on.desc()).limit(10).all()
-    repayment_trend = [{"date": rp.paid_on.strftime("%Y-%m-%d"), "amount": float(rp.paid_amount)} for rp in recent_repayments]
+    return (
+        select(models.Repayment.paid_on, models.Repayment.paid_amount)
+        .where(models.Repayment.status == "paid")
+        .order_by(models.Repayment.paid_on.desc())
+        .limit(10)
+    )
+
+
+def _dashboard_stats(totals, recent_repayments):
+    status_dist = {
+        s.value: getattr(totals, s.value) for s in models.LoanStatus if getattr(totals, s.value)
+    }
+    repayment_trend = [{"date": paid_on.strftime("%Y-%m-%d"), "amount": float(amount)} for paid_on, amount in recent_repayments]
     # Reverse to show chronological order for chart
     repayment_trend.reverse()
 
     return {
-        "total_borrowers": total_borrowers,
-        "total_loans": total_loans,
-        "total_active_principal": float(total_active_principal),
-        "total_outstanding": float(total_outstanding),
+        "total_borrowers": totals.total_borrowers,
+        "total_loans": totals.total_loans,
+        "total_active_principal": float(totals.total_active_principal),
+        "total_outstanding": float(totals.total_outstanding),
         "status_distribution": status_dist,
         "repayment_trend": repayment_trend
     }
+
+
+def compute_dashboard_stats(db: Session):
+    totals = db.execute(_dashboard_totals_stmt()).one()
+    recent = db.execute(_recent_repayments_stmt()).all()
+    return _dashboard_stats(totals, recent)
+
+
+async def compute_dashboard_stats_async(db: AsyncSession):
+    totals = (await db.execute(_dashboard_totals_stmt())).one()
+    recent = (await db.execute(_recent_repayments_stmt())).all()
+    return _dashboard_stats(totals, recent)
+
+
+@router.get("/dashboard-stats", dependencies=[Depends(require_roles("admin", "loan_officer", "accountant"))])
+async def get_dashboard_stats(db=Depends(get_read_db)):
+    stats = _dashboard_cache.get("stats")
+    if stats is None:
+        generation = _dashboard_cache.generation
+        stats = await run_read(db, compute_dashboard_stats, compute_dashboard_stats_async)
+        _dashboard_cache.set("stats", stats, generation=generation)
+    return stats
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..database import get_db
 from .. import schemas, crud, models
-from ..deps import require_roles
+from ..deps import require_roles, invalidate_principal
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -16,4 +16,5 @@ def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
     user = crud.create_user(db, user_in.username, user_in.password, user_in.role)
+    invalidate_principal(user.username)
     return user
@@ -0,0 +1,160 @@
+# app/schedule.py
+# Repayment schedule materialization.
+#
+# With SCHEDULE_MODE=full (the default) disbursement writes every
+# installment, as before. With SCHEDULE_MODE=windowed, a loan longer than
+# SCHEDULE_WINDOW months only gets its first SCHEDULE_WINDOW rows. The loan
+# keeps everything needed to rebuild the rest (principal, interest_rate,
+# term_months, disbursed_on) plus installments_materialized. The scheduler
+# (jobs.py) tops the window up so there are always SCHEDULE_WINDOW
+# installments past whichever is later: what has fallen due or what has
+# been paid. Reads fill in the unwritten tail on the fly with id None; those
+# rows cannot be paid until they are written.
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import amortization, models
+
+SCHEDULE_MODE = os.getenv("SCHEDULE_MODE", "full")  # full / windowed
+SCHEDULE_WINDOW = int(os.getenv("SCHEDULE_WINDOW", 12))
+
+
+def is_windowed(term_months: int) -> bool:
+    return SCHEDULE_MODE == "windowed" and term_months > SCHEDULE_WINDOW
+
+
+def initial_count(term_months: int) -> int:
+    """Installments to write at disbursement."""
+    return SCHEDULE_WINDOW if is_windowed(term_months) else term_months
+
+
+def installment_rows(loan_id: int, schedule, k: int, start: datetime, first: int, last: int):
+    """repayments rows for installments first+1..last of loan k in schedule."""
+    dates = amortization.due_dates(start, last)
+    return [
+        {
+            "loan_id": loan_id,
+            "due_date": dates[i],
+            "amount": amortization.cents_to_decimal(schedule.payment[k, i]),
+            "paid_amount": Decimal("0.00"),
+            "status": "due",
+        }
+        for i in range(first, last)
+    ]
+
+
+def schedule_params_stmt(loan_id: int):
+    Loan = models.Loan
+    return select(
+        Loan.id,
+        Loan.schedule_mode,
+        Loan.principal,
+        Loan.interest_rate,
+        Loan.term_months,
+        Loan.disbursed_on,
+        Loan.installments_materialized,
+    ).where(Loan.id == loan_id)
+
+
+def projected(params):
+    """The installments of a windowed loan that have no row yet, as RepaymentOut dicts."""
+    if (
+        params is None
+        or params.schedule_mode != "windowed"
+        or params.installments_materialized >= params.term_months
+    ):
+        return []
+    schedule = amortization.amortize([params.principal], [params.interest_rate], [params.term_months])
+    rows = installment_rows(
+        params.id, schedule, 0, params.disbursed_on, params.installments_materialized, params.term_months
+    )
+    return [{**row, "id": None, "paid_on": None} for row in rows]
+
+
+def _installments_due(start: datetime, now: datetime, term_months: int) -> int:
+    if start.tzinfo is None:
+        now = now.replace(tzinfo=None)
+    elapsed = relativedelta(now, start)
+    return max(0, min(term_months, elapsed.years * 12 + elapsed.months))
+
+
+def extend_windows(db: Session, now: datetime = None, batch_size: int = 1000) -> int:
+    """Write the next installments of windowed schedules that have run low.
+
+    Walks the candidate loans (idx_loans_schedule_window) in id order, a
+    batch at a time. Each batch locks its loans, skipping any a payer holds,
+    writes the missing rows with one INSERT and bumps the loans' versions.
+    Then it commits. Returns the number of rows written.
+    """
+    Loan, Repayment = models.Loan, models.Repayment
+    now = now or datetime.now(timezone.utc)
+    total = 0
+    last_id = 0
+    while True:
+        ids = db.execute(
+            select(Loan.id)
+            .where(
+                Loan.schedule_mode == "windowed",
+                Loan.installments_materialized < Loan.term_months,
+                Loan.status == models.LoanStatus.active,
+                Loan.id > last_id,
+            )
+            .order_by(Loan.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        last_id = ids[-1]
+        loans = db.execute(
+            select(
+                Loan.id, Loan.principal, Loan.interest_rate, Loan.term_months,
+                Loan.disbursed_on, Loan.installments_materialized, Loan.version,
+            )
+            .where(Loan.id.in_(ids))
+            .order_by(Loan.id)
+            .with_for_update(skip_locked=True)
+        ).all()
+        paid = dict(
+            db.execute(
+                select(Repayment.loan_id, func.count())
+                .where(Repayment.loan_id.in_([loan.id for loan in loans]), Repayment.status == "paid")
+                .group_by(Repayment.loan_id)
+            ).all()
+        )
+        targets = {}
+        for loan in loans:
+            settled = max(_installments_due(loan.disbursed_on, now, loan.term_months), paid.get(loan.id, 0))
+            target = min(loan.term_months, settled + SCHEDULE_WINDOW)
+            if target > loan.installments_materialized:
+                targets[loan.id] = target
+        grow = [loan for loan in loans if loan.id in targets]
+        if grow:
+            schedule = amortization.amortize(
+                [loan.principal for loan in grow],
+                [loan.interest_rate for loan in grow],
+                [loan.term_months for loan in grow],
+            )
+            rows = []
+            for k, loan in enumerate(grow):
+                rows.extend(
+                    installment_rows(
+                        loan.id, schedule, k, loan.disbursed_on, loan.installments_materialized, targets[loan.id]
+                    )
+                )
+            db.execute(insert(Repayment), rows)
+            db.execute(
+                update(Loan),
+                [
+                    {"id": loan.id, "installments_materialized": targets[loan.id], "version": loan.version + 1}
+                    for loan in grow
+                ],
+            )
+            total += len(rows)
+        db.commit()
+        if len(ids) < batch_size:
+            return total
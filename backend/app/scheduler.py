@@ -0,0 +1,44 @@
+# app/scheduler.py
+# Minimal in-process periodic jobs, started and stopped by the app lifespan.
+#
+# Every worker process runs its own copy of each job, so jobs must be
+# idempotent and safe to run concurrently (set-based, SKIP LOCKED).
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob(NamedTuple):
+    name: str
+    interval: float  # seconds between the end of one run and the next
+    fn: Callable[[], object]  # blocking; runs in the threadpool
+
+
+async def _loop(job: PeriodicJob):
+    while True:
+        try:
+            await run_in_threadpool(job.fn)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Periodic job %s failed", job.name)
+        await asyncio.sleep(job.interval)
+
+
+class Scheduler:
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, jobs):
+        for job in jobs:
+            self._tasks.append(asyncio.create_task(_loop(job), name=job.name))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -1,8 +1,14 @@
 # app/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from datetime import datetime
 from decimal import Decimal
+from .amortization import MAX_ANNUAL_RATE, MAX_PRINCIPAL, MAX_TERM_MONTHS
+
+# Bounded to what the amortization engine and loans.principal can hold
+Principal = Annotated[Decimal, Field(gt=0, le=MAX_PRINCIPAL)]
+AnnualRate = Annotated[float, Field(ge=0, le=MAX_ANNUAL_RATE)]
+TermMonths = Annotated[int, Field(ge=1, le=MAX_TERM_MONTHS)]
 
 class Token(BaseModel):
     access_token: str
@@ -34,6 +40,32 @@ class BorrowerOut(BorrowerCreate):
     class Config:
         orm_mode = True
 
+class BorrowerPage(BaseModel):
+    items: List[BorrowerOut]
+    next_cursor: Optional[str] = None
+
+class BorrowerPortfolioOut(BaseModel):
+    borrower_id: int
+    borrower_name: str
+    credit_score: Optional[int] = None
+    total_loans_count: int
+    active_loans_count: int
+    total_principal_disbursed: Decimal
+    total_outstanding_amount: Decimal
+    total_repaid_principal: Decimal
+    exposure: Decimal
+
+# refreshed_at is when the figures were computed; age_seconds is how long ago
+class BorrowerPortfolioDetail(BorrowerPortfolioOut):
+    refreshed_at: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
+class PortfolioPage(BaseModel):
+    items: List[BorrowerPortfolioOut]
+    next_cursor: Optional[str] = None
+    refreshed_at: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
 class LoanTypeCreate(BaseModel):
     name: str
     max_amount: Decimal
@@ -70,9 +102,9 @@ class LedgerOut(BaseModel):
 class LoanCreate(BaseModel):
     borrower_id: int
     loan_type_id: Optional[int] = None
-    principal: Decimal
-    interest_rate: float
-    term_months: int
+    principal: Principal
+    interest_rate: AnnualRate
+    term_months: TermMonths
     collaterals: Optional[List[CollateralCreate]] = []
 
 class LoanOut(BaseModel):
@@ -94,11 +126,65 @@ class LoanOut(BaseModel):
     class Config:
         orm_mode = True
 
+class LoanSummaryOut(BaseModel):
+    id: int
+    borrower_id: int
+    borrower_name: Optional[str] = None
+    loan_type_id: Optional[int]
+    principal: Decimal
+    interest_rate: float
+    term_months: int
+    status: str
+    outstanding: Optional[Decimal] = None
+    disbursed_on: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class LoanPage(BaseModel):
+    items: List[LoanSummaryOut]
+    next_cursor: Optional[str] = None
+
+class LoanBatchApprove(BaseModel):
+    loan_ids: List[int]
+
+class LoanApprovalResult(BaseModel):
+    loan_id: int
+    outcome: str  # approved / not_found / not_pending / locked
+    detail: Optional[str] = None
+
+class LoanBatchApproveOut(BaseModel):
+    results: List[LoanApprovalResult]
+
+class LoanSimulationRequest(BaseModel):
+    # Every combination of the three lists is simulated
+    principals: List[Principal]
+    interest_rates: List[AnnualRate]
+    term_months: List[TermMonths]
+    include_schedule: bool = True
+
+class InstallmentOut(BaseModel):
+    installment: int
+    payment: Decimal
+    interest: Decimal
+    principal: Decimal
+    balance_after: Decimal
+
+class LoanSimulationOut(BaseModel):
+    principal: Decimal
+    interest_rate: float
+    term_months: int
+    emi: Decimal
+    total_interest: Decimal
+    total_payable: Decimal
+    schedule: List[InstallmentOut] = []
+
 class RepaymentCreate(BaseModel):
     paid_amount: Decimal
 
 class RepaymentOut(BaseModel):
-    id: int
+    id: Optional[int]  # None for a windowed schedule's not-yet-written installments
     loan_id: int
     due_date: datetime
     amount: Decimal
@@ -107,3 +193,32 @@ class RepaymentOut(BaseModel):
     status: str
     class Config:
         orm_mode = True
+
+class OverdueRepaymentOut(BaseModel):
+    repayment_id: int
+    loan_id: int
+    borrower_name: str
+    borrower_address: Optional[str] = None
+    due_date: datetime
+    amount_due: Decimal
+    paid_amount: Decimal
+    days_overdue: int
+
+class OverduePage(BaseModel):
+    items: List[OverdueRepaymentOut]
+    next_cursor: Optional[str] = None
+
+class IngestLineResult(BaseModel):
+    line: int
+    repayment_id: Optional[int] = None
+    status: str  # applied / rejected / error
+    detail: Optional[str] = None
+    repayment_status: Optional[str] = None
+    loan_outstanding: Optional[Decimal] = None
+
+class IngestReport(BaseModel):
+    lines: int
+    applied: int
+    rejected: int
+    errors: int
+    results: List[IngestLineResult]
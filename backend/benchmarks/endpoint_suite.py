@@ -0,0 +1,288 @@
+"""Endpoint benchmark suite with latency percentiles and regression tracking.
+
+Drives the real ASGI app (app.main:app, lifespan included) in-process through
+httpx against the PostgreSQL database configured in .env, for each scenario
+at each concurrency level, and reports throughput, p50/p95/p99 latency and
+SQL queries per request. Use a dedicated benchmark database: approve_loan
+and pay_repayment write to it (pending loans are created as needed).
+
+    # seed once (see generate_data.py), then record a baseline
+    python benchmarks/endpoint_suite.py --seed-borrowers 20000 --save-baseline
+    # later: compare against it, exit 1 on regression
+    python benchmarks/endpoint_suite.py
+
+A run regresses when, for any scenario/concurrency pair also in the
+baseline, p95 latency grows or throughput drops by more than --threshold
+(default 20%), or queries per request grow at all.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import event, insert, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, database, models  # noqa: E402
+from app.main import app  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baselines", "endpoint_suite.json")
+SCENARIOS = (
+    "login",
+    "get_all_loans",
+    "get_loan",
+    "approve_loan",
+    "pay_repayment",
+    "list_repayments_for_loan",
+    "dashboard_stats",
+)
+
+# Queries are attributed to the request that issued them: each request runs
+# in its own task with a fresh counter, and contextvars follow it into the
+# threadpool.
+_query_counter = contextvars.ContextVar("query_counter", default=None)
+
+
+def _count_query(*_):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def _instrument_engines():
+    event.listen(database.engine, "before_cursor_execute", _count_query)
+    if database.ASYNC_DB:
+        event.listen(database.async_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Fixtures:
+    """Ids the scenarios draw from, prepared before timing starts."""
+
+    def __init__(self, username, password, needed_pending):
+        with database.SessionLocal() as db:
+            if not crud.get_user_by_username(db, username):
+                crud.create_user(db, username, password, models.RoleEnum.admin)
+            self.loan_ids = db.execute(
+                select(models.Loan.id).where(models.Loan.status == models.LoanStatus.active).limit(2000)
+            ).scalars().all()
+            if not self.loan_ids:
+                sys.exit("No active loans: seed the database first (--seed-borrowers or generate_data.py)")
+            self.repayment_ids = db.execute(
+                select(models.Repayment.id)
+                .join(models.Loan, models.Loan.id == models.Repayment.loan_id)
+                .where(models.Loan.status == models.LoanStatus.active, models.Repayment.status == "due")
+                .limit(5000)
+            ).scalars().all()
+            pending = db.execute(
+                select(models.Loan.id).where(models.Loan.status == models.LoanStatus.pending).limit(needed_pending)
+            ).scalars().all()
+            missing = needed_pending - len(pending)
+            if missing > 0:
+                borrower_id = db.execute(select(models.Borrower.id).limit(1)).scalar()
+                created = db.execute(
+                    insert(models.Loan).returning(models.Loan.id),
+                    [
+                        {"borrower_id": borrower_id, "principal": 10000, "interest_rate": 12.0,
+                         "term_months": 12, "status": models.LoanStatus.pending}
+                        for _ in range(missing)
+                    ],
+                ).scalars().all()
+                db.commit()
+                pending = list(pending) + list(created)
+            self.pending_ids = list(pending)
+        self.username, self.password = username, password
+
+
+def _request_factory(name, fx: Fixtures, headers):
+    """Returns a callable(client) -> awaitable response for one request of scenario name."""
+    if name == "login":
+        data = {"username": fx.username, "password": fx.password}
+        return lambda c: c.post("/auth/login", data=data)
+    if name == "get_all_loans":
+        return lambda c: c.get("/loans/get_all_loans", params={"limit": 100}, headers=headers)
+    if name == "get_loan":
+        return lambda c: c.get(f"/loans/{random.choice(fx.loan_ids)}", headers=headers)
+    if name == "approve_loan":
+        return lambda c: c.post(f"/loans/{fx.pending_ids.pop()}/approve", headers=headers)
+    if name == "pay_repayment":
+        return lambda c: c.post(
+            f"/repayments/{random.choice(fx.repayment_ids)}/pay", json={"paid_amount": "0.01"}, headers=headers
+        )
+    if name == "list_repayments_for_loan":
+        return lambda c: c.get(f"/repayments/loan/{random.choice(fx.loan_ids)}", headers=headers)
+    if name == "dashboard_stats":
+        return lambda c: c.get("/reports/dashboard-stats", headers=headers)
+    raise ValueError(name)
+
+
+async def _timed(client, make_request):
+    counter = [0]
+    _query_counter.set(counter)
+    start = time.perf_counter()
+    res = await make_request(client)
+    return res.status_code, time.perf_counter() - start, counter[0]
+
+
+async def run_scenario(client, make_request, concurrency, total, warmup):
+    for _ in range(warmup):
+        await asyncio.create_task(_timed(client, make_request))
+
+    results = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            # A task per request gives each its own context (query counter)
+            results.append(await asyncio.create_task(_timed(client, make_request)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if 200 <= r[0] < 300]
+    latencies = sorted(lat for _, lat, _ in ok)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "queries_per_request": (sum(q for _, _, q in ok) / len(ok)) if ok else 0.0,
+    }
+
+
+async def run_suite(args):
+    _instrument_engines()
+    fixture_requests = (args.requests + args.warmup) * len(args.concurrency)
+    fx = Fixtures(args.user, args.password, fixture_requests if "approve_loan" in args.scenarios else 0)
+
+    # Unhandled app errors come back as 500s and are counted, not raised
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            res = await client.post("/auth/login", data={"username": fx.username, "password": fx.password})
+            res.raise_for_status()
+            headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+            for name in args.scenarios:
+                make_request = _request_factory(name, fx, headers)
+                for c in args.concurrency:
+                    r = await run_scenario(client, make_request, c, args.requests, args.warmup)
+                    results[f"{name}@{c}"] = {"scenario": name, **r}
+                    print(
+                        f"{name:<26} {c:>5} {r['ok']:>6} {r['errors']:>5} {r['throughput_rps']:>9.1f} "
+                        f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                        f"{r['queries_per_request']:>6.1f}",
+                        flush=True,
+                    )
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of human-readable regressions."""
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        cur = results.get(key)
+        if not cur:
+            continue
+        if base["p95_ms"] and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {base['p95_ms']:.1f}ms -> {cur['p95_ms']:.1f}ms")
+        if base["throughput_rps"] and cur["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{key}: throughput {base['throughput_rps']:.1f} -> {cur['throughput_rps']:.1f} req/s"
+            )
+        if cur["queries_per_request"] > base["queries_per_request"] + 0.05:
+            regressions.append(
+                f"{key}: queries/request {base['queries_per_request']:.2f} -> {cur['queries_per_request']:.2f}"
+            )
+        if cur["errors"] > base.get("errors", 0):
+            regressions.append(f"{key}: {cur['errors']} errors (baseline {base.get('errors', 0)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--user", default="bench_admin")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--seed-borrowers", type=int, help="load this many borrowers with generate_data.py first")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if args.seed_borrowers:
+        import generate_data
+        generate_data.main(["--borrowers", str(args.seed_borrowers)])
+
+    random.seed(0)
+    print(f"{'scenario':<26} {'conc':>5} {'ok':>6} {'err':>5} {'req/s':>9} "
+          f"{'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'q/req':>6}")
+    results = asyncio.run(run_suite(args))
+    run = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "db_mode": database.DB_MODE,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; rerun with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions against baseline ({baseline['meta'].get('commit')}):")
+        for r in regressions:
+            print("  " + r)
+        sys.exit(1)
+    print(f"\nNo regressions against baseline ({baseline['meta'].get('commit')})")
+
+
+if __name__ == "__main__":
+    main()
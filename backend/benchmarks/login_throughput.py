@@ -0,0 +1,81 @@
+"""Login throughput benchmark for sizing the password-hash pool.
+
+Fires concurrent POST /auth/login requests at a running server and reports
+throughput, latency percentiles and how many requests were shed with 503.
+Run it against uvicorn started with different HASH_POOL_SIZE /
+HASH_QUEUE_LIMIT / BCRYPT_ROUNDS values and pick the smallest pool that
+reaches the throughput you need without 503s at your expected peak.
+
+    python benchmarks/login_throughput.py --user admin --password secret \
+        --concurrency 1 4 16 64 --requests 200
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def _login(session, url, username, password):
+    start = time.perf_counter()
+    res = session.post(url, data={"username": username, "password": password})
+    return res.status_code, time.perf_counter() - start
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(base_url, username, password, concurrency, total):
+    url = f"{base_url.rstrip('/')}/auth/login"
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(lambda _: _login(session, url, username, password), range(total)))
+    elapsed = time.perf_counter() - started
+
+    ok = sorted(lat for code, lat in results if code == 200)
+    shed = sum(1 for code, _ in results if code == 503)
+    failed = len(results) - len(ok) - shed
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(ok),
+        "shed_503": shed,
+        "failed": failed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(ok, 50) * 1000,
+        "p95_ms": _percentile(ok, 95) * 1000,
+        "p99_ms": _percentile(ok, 99) * 1000,
+        "mean_ms": (statistics.fmean(ok) * 1000) if ok else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    args = parser.parse_args()
+
+    print(f"{'conc':>5} {'ok':>6} {'503':>5} {'fail':>5} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}")
+    for c in args.concurrency:
+        r = run(args.base_url, args.user, args.password, c, args.requests)
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>6} {r['shed_503']:>5} {r['failed']:>5} "
+            f"{r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Payment contention benchmark: many concurrent payers on one loan.
+
+Logs in as an admin/accountant, then fires concurrent POST
+/repayments/{id}/pay requests that all hit the installments of a single
+active loan. Afterwards it checks that the loan's outstanding dropped by
+exactly the sum of accepted payments (no lost updates) and that one ledger
+entry was written per payment, and reports throughput and latency.
+
+Use a loan with a large outstanding so it does not close mid-run:
+
+    python benchmarks/payment_contention.py --user admin --password secret \
+        --loan-id 1 --concurrency 1 8 32 --requests 200 --amount 0.01
+"""
+import argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import requests
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _login(base_url, username, password):
+    res = requests.post(f"{base_url}/auth/login", data={"username": username, "password": password})
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+def _loan_state(session, base_url, loan_id):
+    res = session.get(f"{base_url}/loans/{loan_id}")
+    res.raise_for_status()
+    loan = res.json()
+    return Decimal(str(loan["outstanding"])), len(loan.get("ledger_entries") or [])
+
+
+def _pay(session, url, amount):
+    start = time.perf_counter()
+    res = session.post(url, json={"paid_amount": amount})
+    return res.status_code, time.perf_counter() - start
+
+
+def run(session, base_url, loan_id, concurrency, total, amount):
+    res = session.get(f"{base_url}/repayments/loan/{loan_id}")
+    res.raise_for_status()
+    repayment_ids = [r["id"] for r in res.json()]
+    if not repayment_ids:
+        raise SystemExit(f"Loan {loan_id} has no repayments; approve it first")
+    # Spread payers over the installments so both the repayment rows and the
+    # shared loan row are contended
+    urls = [
+        f"{base_url}/repayments/{rid}/pay"
+        for rid in itertools.islice(itertools.cycle(repayment_ids), total)
+    ]
+
+    before, ledger_before = _loan_state(session, base_url, loan_id)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(lambda u: _pay(session, u, amount), urls))
+    elapsed = time.perf_counter() - started
+    after, ledger_after = _loan_state(session, base_url, loan_id)
+
+    ok = sorted(lat for code, lat in results if code == 200)
+    expected = max(before - Decimal(amount) * len(ok), Decimal("0.00"))
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(ok, 50) * 1000,
+        "p95_ms": _percentile(ok, 95) * 1000,
+        "p99_ms": _percentile(ok, 99) * 1000,
+        "consistent": after == expected and ledger_after - ledger_before == len(ok),
+        "outstanding": after,
+        "expected": expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--loan-id", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="payments per concurrency level")
+    parser.add_argument("--amount", default="0.01", help="amount of each payment")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    token = _login(base_url, args.user, args.password)
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(args.concurrency))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    print(f"{'conc':>5} {'ok':>6} {'fail':>5} {'req/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}  consistent")
+    for c in args.concurrency:
+        r = run(session, base_url, args.loan_id, c, args.requests, args.amount)
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>6} {r['failed']:>5} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}  "
+            f"{'yes' if r['consistent'] else 'NO'} (outstanding {r['outstanding']}, expected {r['expected']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
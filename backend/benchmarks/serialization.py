@@ -0,0 +1,139 @@
+"""Response serialization benchmark for get_all_loans-sized payloads.
+
+Times how a page of loans becomes response bytes, without a database:
+
+  fastapi   validate against response_model, dump to JSON-mode dicts,
+            json.dumps (FastAPI's response_model path with JSONResponse)
+  orjson    the same, encoded by app.responses.ORJSONResponse
+  fast_path app.responses.model_response: one validation, bytes written
+            by pydantic-core
+
+It also reports body size with and without gzip at GZIP_LEVEL. Run the
+endpoint suite (benchmarks/endpoint_suite.py) for end-to-end numbers
+against a real database.
+
+    python benchmarks/serialization.py --rows 50 500 --repeat 200
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import models, responses, schemas  # noqa: E402
+from app.main import GZIP_LEVEL  # noqa: E402
+
+SUMMARIES = TypeAdapter(List[schemas.LoanSummaryOut])
+
+
+def make_loans(n):
+    """Transient ORM loans shaped like a get_all_loans page."""
+    now = datetime(2025, 1, 1)
+    borrowers = [models.Borrower(id=i, name=f"Borrower {i}") for i in range(1, 51)]
+    loans = []
+    for i in range(n):
+        loan = models.Loan(
+            id=i + 1,
+            borrower_id=borrowers[i % 50].id,
+            loan_type_id=1 + i % 4,
+            principal=Decimal("250000.00") + i,
+            interest_rate=10.5,
+            term_months=36,
+            status=models.LoanStatus.active,
+            outstanding=Decimal("123456.78") + i,
+            disbursed_on=now - timedelta(days=i),
+            created_at=now - timedelta(days=i, minutes=5),
+        )
+        loan.borrower = borrowers[i % 50]
+        loans.append(loan)
+    return loans
+
+
+def fastapi_path(loans):
+    value = SUMMARIES.validate_python(loans, from_attributes=True)
+    content = SUMMARIES.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def orjson_path(loans):
+    value = SUMMARIES.validate_python(loans, from_attributes=True)
+    return responses.dumps(SUMMARIES.dump_python(value, mode="json"))
+
+
+def fast_path(loans):
+    return responses.model_response(SUMMARIES, loans).body
+
+
+PATHS = {"fastapi": fastapi_path, "orjson": orjson_path, "fast_path": fast_path}
+
+
+def _time(fn, arg, repeat):
+    fn(arg)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def run(rows, repeat):
+    loans = make_loans(rows)
+    bodies = {name: fn(loans) for name, fn in PATHS.items()}
+    # Same JSON document whichever path produced it
+    decoded = {name: json.loads(body) for name, body in bodies.items()}
+    assert decoded["fastapi"] == decoded["orjson"] == decoded["fast_path"], "paths disagree"
+
+    body = bodies["fast_path"]
+    start = time.perf_counter()
+    compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    gzip_ms = (time.perf_counter() - start) * 1000
+
+    results = []
+    baseline = None
+    for name, fn in PATHS.items():
+        median, p95 = _time(fn, loans, repeat)
+        baseline = baseline or median
+        results.append({
+            "rows": rows,
+            "path": name,
+            "median_ms": median * 1000,
+            "p95_ms": p95 * 1000,
+            "speedup": baseline / median if median else 0.0,
+        })
+    size = {"rows": rows, "bytes": len(body), "gzip_bytes": len(compressed), "gzip_ms": gzip_ms}
+    return results, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>6} {'path':<10} {'median ms':>10} {'p95 ms':>8} {'speedup':>8}")
+    sizes = []
+    for rows in args.rows:
+        results, size = run(rows, args.repeat)
+        sizes.append(size)
+        for r in results:
+            print(f"{r['rows']:>6} {r['path']:<10} {r['median_ms']:>10.2f} {r['p95_ms']:>8.2f} {r['speedup']:>7.2f}x")
+    print()
+    print(f"{'rows':>6} {'bytes':>9} {'gzip bytes':>11} {'ratio':>6} {'gzip ms':>8}")
+    for s in sizes:
+        ratio = s["bytes"] / s["gzip_bytes"] if s["gzip_bytes"] else 0.0
+        print(f"{s['rows']:>6} {s['bytes']:>9} {s['gzip_bytes']:>11} {ratio:>5.1f}x {s['gzip_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Overdue queue index ordered for keyset paging
+
+Revision ID: 0c5e8b2d7a14
+Revises: 1e7c4a9d3f60
+Create Date: 2026-10-17 20:12:43.581907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c5e8b2d7a14'
+down_revision: Union[str, Sequence[str], None] = '1e7c4a9d3f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /repayments/overdue pages on (due_date, id) across both statuses,
+    # which idx_repayments_overdue (status first) cannot return in order.
+    # That index stays for mark_overdue's status = 'due' scan.
+    op.create_index(
+        'idx_repayments_overdue_queue', 'repayments', ['due_date', 'id'], unique=False,
+        postgresql_where=sa.text("status IN ('due', 'overdue')"), if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_repayments_overdue_queue', table_name='repayments', if_exists=True)
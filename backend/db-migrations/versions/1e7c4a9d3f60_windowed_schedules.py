@@ -0,0 +1,38 @@
+"""Windowed repayment schedules
+
+Revision ID: 1e7c4a9d3f60
+Revises: 6b1d3f8a2c59
+Create Date: 2026-10-17 19:31:08.417290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e7c4a9d3f60'
+down_revision: Union[str, Sequence[str], None] = '6b1d3f8a2c59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing loans keep their fully written schedules
+    op.execute("ALTER TABLE loans ADD COLUMN IF NOT EXISTS schedule_mode varchar(16) NOT NULL DEFAULT 'full'")
+    op.execute("ALTER TABLE loans ADD COLUMN IF NOT EXISTS installments_materialized integer")
+    # Only loans whose window still has to grow; the extend job walks this
+    op.create_index(
+        'idx_loans_schedule_window', 'loans', ['id'],
+        postgresql_where=sa.text("schedule_mode = 'windowed' AND installments_materialized < term_months"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_loans_schedule_window', table_name='loans', if_exists=True)
+    op.drop_column('loans', 'installments_materialized')
+    op.drop_column('loans', 'schedule_mode')
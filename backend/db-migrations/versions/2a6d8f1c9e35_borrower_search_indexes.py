@@ -0,0 +1,46 @@
+"""Borrower search indexes
+
+Revision ID: 2a6d8f1c9e35
+Revises: 7e2c9b4f0a13
+Create Date: 2026-10-17 17:05:21.447310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a6d8f1c9e35'
+down_revision: Union[str, Sequence[str], None] = '7e2c9b4f0a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Fuzzy (trigram word similarity) matches for GET /borrowers/search?mode=fuzzy
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_borrowers_name_trgm "
+        "ON borrowers USING gin (name gin_trgm_ops)"
+    )
+    # Prefix autocomplete: byte-wise ordering lets LIKE 'abc%' become a range
+    # scan that also returns rows in (name, id) order for the keyset
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_borrowers_name_prefix "
+        "ON borrowers ((lower(name) COLLATE \"C\"), id)"
+    )
+    # Databases built from Loan_System_Complete_Setup.sql already have it
+    op.create_index(
+        'idx_borrowers_credit_monthly', 'borrowers', ['credit_score', 'monthly_income'],
+        unique=False, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_borrowers_name_prefix', table_name='borrowers', if_exists=True)
+    op.drop_index('idx_borrowers_name_trgm', table_name='borrowers', if_exists=True)
+    # The extension and idx_borrowers_credit_monthly may predate this revision
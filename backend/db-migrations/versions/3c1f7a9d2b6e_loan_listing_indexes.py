@@ -0,0 +1,34 @@
+"""Loan listing indexes
+
+Revision ID: 3c1f7a9d2b6e
+Revises: f94616a4c60f
+Create Date: 2026-10-17 09:12:40.118245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a9d2b6e'
+down_revision: Union[str, Sequence[str], None] = 'f94616a4c60f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases built from Loan_System_Complete_Setup.sql already carry the
+    # first two, hence if_not_exists.
+    op.create_index('idx_loans_status', 'loans', ['status'], unique=False, if_not_exists=True)
+    op.create_index('idx_loans_borrower_status', 'loans', ['borrower_id', 'status'], unique=False, if_not_exists=True)
+    op.create_index('idx_loans_created_at_id', 'loans', ['created_at', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_loans_created_at_id', table_name='loans', if_exists=True)
+    op.drop_index('idx_loans_borrower_status', table_name='loans', if_exists=True)
+    op.drop_index('idx_loans_status', table_name='loans', if_exists=True)
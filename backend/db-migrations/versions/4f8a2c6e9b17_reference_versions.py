@@ -0,0 +1,51 @@
+"""Reference data versions for loan types
+
+Revision ID: 4f8a2c6e9b17
+Revises: 9c3e5a7b1d24
+Create Date: 2026-10-17 18:20:37.650812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8a2c6e9b17'
+down_revision: Union[str, Sequence[str], None] = '9c3e5a7b1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reference_versions',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.execute("INSERT INTO reference_versions (name, version) VALUES ('loan_types', 1)")
+    # Any write to loan_types, from the API or by hand, moves the version on
+    # so every worker's cached copy reloads (app/reference.py)
+    op.execute("""
+        CREATE FUNCTION bump_reference_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE reference_versions SET version = version + 1 WHERE name = TG_ARGV[0];
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER trg_loan_types_version "
+        "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON loan_types "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_version('loan_types')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_loan_types_version ON loan_types")
+    op.execute("DROP FUNCTION IF EXISTS bump_reference_version()")
+    op.drop_table('reference_versions')
@@ -0,0 +1,32 @@
+"""Overdue repayments partial index
+
+Revision ID: 5d9a3f6e1b42
+Revises: 8b4e2d1c5a7f
+Create Date: 2026-10-17 13:26:51.207314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9a3f6e1b42'
+down_revision: Union[str, Sequence[str], None] = '8b4e2d1c5a7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Already present on databases built from Loan_System_Complete_Setup.sql
+    op.create_index(
+        'idx_repayments_overdue', 'repayments', ['status', 'due_date'], unique=False,
+        postgresql_where=sa.text("status IN ('due', 'overdue')"), if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_repayments_overdue', table_name='repayments', if_exists=True)
@@ -0,0 +1,29 @@
+"""Loan version for ETags
+
+Revision ID: 6b1d3f8a2c59
+Revises: 4f8a2c6e9b17
+Create Date: 2026-10-17 18:52:14.309826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1d3f8a2c59'
+down_revision: Union[str, Sequence[str], None] = '4f8a2c6e9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped by every write to the loan or its repayment schedule (app/etags.py)
+    op.execute("ALTER TABLE loans ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('loans', 'version')
@@ -0,0 +1,135 @@
+"""Partition ledger and audit_logs by month
+
+Revision ID: 7e2c9b4f0a13
+Revises: 5d9a3f6e1b42
+Create Date: 2026-10-17 15:40:08.912654
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2c9b4f0a13'
+down_revision: Union[str, Sequence[str], None] = '5d9a3f6e1b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# Column lists (without the primary key clause) and indexes per table. The
+# partitioned primary key has to include the partition key, so it becomes
+# (id, <key>) and the key column becomes NOT NULL.
+TABLES = {
+    'ledger': {
+        'key': 'date',
+        'columns': """
+            id integer NOT NULL,
+            loan_id integer NOT NULL REFERENCES loans(id) ON DELETE CASCADE,
+            type varchar(32) NOT NULL,
+            amount numeric(12, 2) NOT NULL,
+            date timestamp with time zone NOT NULL DEFAULT now(),
+            balance_after numeric(12, 2)
+        """,
+        'copy': "id, loan_id, type, amount, coalesce(date, now()), balance_after",
+        'indexes': {
+            'ix_ledger_id': 'id',
+            'idx_ledger_loan_id': 'loan_id',
+            'idx_ledger_type': 'type',
+            'idx_ledger_date': 'date',
+            'idx_ledger_loan_date': 'loan_id, date',
+        },
+    },
+    'audit_logs': {
+        'key': 'timestamp',
+        'columns': """
+            id integer NOT NULL,
+            user_id integer REFERENCES users(id) ON DELETE SET NULL,
+            action varchar(64) NOT NULL,
+            details text,
+            timestamp timestamp with time zone NOT NULL DEFAULT now()
+        """,
+        'copy': "id, user_id, action, details, coalesce(timestamp, now())",
+        'indexes': {
+            'ix_audit_logs_id': 'id',
+            'idx_audit_logs_user_id': 'user_id',
+            'idx_audit_logs_timestamp': 'timestamp',
+            'idx_audit_logs_action': 'action',
+        },
+    },
+}
+
+
+def _add_months(month: date, n: int) -> date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def _swap_out(table: str, suffix: str):
+    """Rename table, its pkey and indexes out of the way; returns the id sequence."""
+    bind = op.get_bind()
+    seq = bind.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table}).scalar()
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_{suffix}")
+    op.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {table}_{suffix}_pkey")
+    for name in TABLES[table]['indexes']:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    return seq
+
+
+def _create_indexes(table: str):
+    for name, cols in TABLES[table]['indexes'].items():
+        op.execute(f"CREATE INDEX {name} ON {table} ({cols})")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # UTC, like the partition bounds and app/partitions.ensure
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    for table, spec in TABLES.items():
+        key = spec['key']
+        seq = _swap_out(table, 'unpartitioned')
+        op.execute(
+            f"CREATE TABLE {table} ({spec['columns']}, PRIMARY KEY (id, {key})) "
+            f"PARTITION BY RANGE ({key})"
+        )
+        if seq:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{seq}'::regclass)")
+            op.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.id")
+
+        # One partition per month (UTC) from the oldest existing row to
+        # MONTHS_AHEAD months out, plus a default for anything else.
+        oldest = bind.execute(sa.text(f"SELECT min({key}) FROM {table}_unpartitioned")).scalar()
+        month = (oldest.astimezone(timezone.utc).date() if oldest else current).replace(day=1)
+        month = min(month, current)
+        last = _add_months(current, MONTHS_AHEAD)
+        while month <= last:
+            nxt = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month} 00:00+00') TO ('{nxt} 00:00+00')"
+            )
+            month = nxt
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        op.execute(f"INSERT INTO {table} SELECT {spec['copy']} FROM {table}_unpartitioned")
+        op.execute(f"DROP TABLE {table}_unpartitioned")
+        # Indexes on the parent cascade to every partition, present and future
+        _create_indexes(table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, spec in TABLES.items():
+        seq = _swap_out(table, 'partitioned')
+        op.execute(f"CREATE TABLE {table} ({spec['columns']}, PRIMARY KEY (id))")
+        if seq:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{seq}'::regclass)")
+            op.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.id")
+        # Archived (already detached) months are not restored
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+        op.execute(f"DROP TABLE {table}_partitioned")
+        _create_indexes(table)
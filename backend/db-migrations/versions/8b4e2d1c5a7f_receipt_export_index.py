@@ -0,0 +1,42 @@
+"""Receipt export index and receipt backfill
+
+Revision ID: 8b4e2d1c5a7f
+Revises: 3c1f7a9d2b6e
+Create Date: 2026-10-17 11:02:13.540871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e2d1c5a7f'
+down_revision: Union[str, Sequence[str], None] = '3c1f7a9d2b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_receipts_created_at', 'receipts', ['created_at', 'id'], unique=False, if_not_exists=True)
+    # GET /repayments/{id}/receipt used to issue missing receipts on read;
+    # issue them here for any paid installment that never got one.
+    op.execute(
+        """
+        INSERT INTO receipts (repayment_id, receipt_number, created_at)
+        SELECT r.id,
+               'REC-' || floor(extract(epoch FROM coalesce(r.paid_on, now())))::bigint || '-' || r.id,
+               coalesce(r.paid_on, now())
+        FROM repayments r
+        WHERE r.paid_amount > 0
+          AND NOT EXISTS (SELECT 1 FROM receipts rc WHERE rc.repayment_id = r.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Backfilled receipts are kept; they are indistinguishable from issued ones.
+    op.drop_index('idx_receipts_created_at', table_name='receipts', if_exists=True)
@@ -0,0 +1,65 @@
+"""Materialized borrower portfolio view
+
+Revision ID: 9c3e5a7b1d24
+Revises: 2a6d8f1c9e35
+Create Date: 2026-10-17 17:48:55.203117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e5a7b1d24'
+down_revision: Union[str, Sequence[str], None] = '2a6d8f1c9e35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# v_borrower_portfolio from PostgreSQL_Views_Procedures.md, plus the columns
+# the API sorts on. Repaid principal only counts loans with an outstanding
+# balance; exposure is what is still owed on approved and active loans.
+PORTFOLIO_SELECT = """
+    SELECT
+        b.id AS borrower_id,
+        b.name AS borrower_name,
+        b.credit_score,
+        COUNT(l.id) AS total_loans_count,
+        COUNT(l.id) FILTER (WHERE l.status = 'active') AS active_loans_count,
+        COALESCE(SUM(l.principal), 0) AS total_principal_disbursed,
+        COALESCE(SUM(l.outstanding), 0) AS total_outstanding_amount,
+        COALESCE(SUM(l.principal - l.outstanding), 0) AS total_repaid_principal,
+        COALESCE(SUM(COALESCE(l.outstanding, l.principal))
+                 FILTER (WHERE l.status IN ('approved', 'active')), 0) AS exposure
+    FROM borrowers b
+    LEFT JOIN loans l ON l.borrower_id = b.id
+    GROUP BY b.id, b.name, b.credit_score
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Replaces the plain view, if it was created from the docs
+    op.execute("DROP VIEW IF EXISTS v_borrower_portfolio")
+    op.execute(f"CREATE MATERIALIZED VIEW v_borrower_portfolio AS {PORTFOLIO_SELECT} WITH DATA")
+    # REFRESH ... CONCURRENTLY needs a unique index without a WHERE clause
+    op.execute("CREATE UNIQUE INDEX idx_v_borrower_portfolio_borrower ON v_borrower_portfolio (borrower_id)")
+    op.execute("CREATE INDEX idx_v_borrower_portfolio_exposure ON v_borrower_portfolio (exposure, borrower_id)")
+    op.execute(
+        "CREATE INDEX idx_v_borrower_portfolio_outstanding "
+        "ON v_borrower_portfolio (total_outstanding_amount, borrower_id)"
+    )
+    op.create_table(
+        'matview_refreshes',
+        sa.Column('view_name', sa.String(length=64), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('view_name'),
+    )
+    op.execute("INSERT INTO matview_refreshes (view_name, refreshed_at) VALUES ('v_borrower_portfolio', now())")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('matview_refreshes')
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS v_borrower_portfolio")
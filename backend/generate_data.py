@@ -0,0 +1,414 @@
+"""High-volume synthetic data generator for load and scale testing.
+
+Generates borrowers, loans, collateral, repayments, receipts and ledger rows
+and loads them into PostgreSQL with COPY, e.g. for a 1M-borrower /
+~50M-repayment dataset:
+
+    python generate_data.py --borrowers 1000000 --seed 42 --workers 8
+
+Borrowers are split into shards of --shard-size. Each shard is generated
+from its own seeded RNG (so output is reproducible for a given seed) and
+loaded by a worker process in a single transaction that also records the
+shard as done; rerunning the same command resumes with the shards that are
+missing. Ids are derived from the borrower id, so shards never collide and
+every foreign key points at a row of the same shard or at reference data.
+
+Before the first shard, secondary indexes and foreign keys on the generated
+tables are saved and dropped; once every shard is in they are rebuilt (which
+validates referential integrity in one pass), sequences are moved past the
+generated ids and the tables are analyzed. --reset truncates the generated
+tables and starts over.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import psycopg2
+from faker import Faker
+
+from app import amortization, partitions
+from app.database import DATABASE_URL, SessionLocal
+
+# Generated tables in load (parent before child) order, with COPY columns
+TABLES = {
+    "borrowers": ("id", "name", "address", "income", "monthly_income", "credit_score", "created_at"),
+    "loans": ("id", "borrower_id", "loan_type_id", "principal", "interest_rate", "term_months",
+              "disbursed_on", "status", "outstanding", "created_at"),
+    "collateral": ("id", "loan_id", "type", "value", "description", "submitted_on"),
+    "repayments": ("id", "loan_id", "due_date", "amount", "paid_amount", "paid_on", "status"),
+    "receipts": ("id", "repayment_id", "receipt_number", "created_at"),
+    "ledger": ("id", "loan_id", "type", "amount", "date", "balance_after"),
+}
+
+# Id layout: every borrower owns MAX_LOANS loan ids, every loan owns
+# MAX_TERM repayment ids and MAX_TERM + 1 ledger ids.
+MAX_LOANS = 3
+MAX_TERM = 240
+TERM_OPTIONS = [12, 24, 36, 48, 60, 120, 180, 240]
+INT4_MAX = 2**31 - 1
+
+DEFAULT_LOAN_TYPES = [
+    ("Personal Loan", 50000, 36, 12.5),
+    ("Gold Loan", 100000, 24, 10.0),
+    ("Vehicle Loan", 500000, 60, 9.5),
+    ("Home Loan", 2000000, 240, 8.0),
+]
+FIXED_USERS = [("admin", "admin"), ("officer", "loan_officer"), ("accountant", "accountant")]
+
+CENT = Decimal("0.01")
+
+
+def loan_id(borrower_id: int, k: int) -> int:
+    return (borrower_id - 1) * MAX_LOANS + k + 1
+
+
+def repayment_id(loan: int, n: int) -> int:
+    return (loan - 1) * MAX_TERM + n
+
+
+def ledger_id(loan: int, n: int) -> int:
+    return (loan - 1) * (MAX_TERM + 1) + n + 1
+
+
+# --- generation (pure; runs in the workers) --------------------------------
+
+def generate_shard(seed: int, shard: int, lo: int, hi: int, as_of: datetime, loan_types):
+    """Rows for borrowers [lo, hi) as {table: (csv StringIO, row count)}."""
+    rng = random.Random(f"{seed}:{shard}")
+    fake = Faker()
+    fake.seed_instance(f"{seed}:{shard}")
+    out = {t: io.StringIO() for t in TABLES}
+    w = {t: csv.writer(out[t]) for t in TABLES}
+    counts = dict.fromkeys(TABLES, 0)
+
+    def emit(table, *row):
+        w[table].writerow(row)
+        counts[table] += 1
+
+    disbursed = []  # loan rows whose schedules are generated below, in one batch
+    for b in range(lo, hi):
+        income = round(rng.uniform(3000, 15000), 2)
+        emit("borrowers", b, fake.name(), fake.address().replace("\n", ", "), income, income,
+             rng.randint(300, 850), (as_of - timedelta(days=rng.randint(760, 1100))).isoformat())
+        if rng.random() >= 0.8:
+            continue
+        for k in range(rng.randint(1, MAX_LOANS)):
+            lid = loan_id(b, k)
+            type_id, max_amount, max_tenure, rate = rng.choice(loan_types)
+            principal = Decimal(str(round(rng.uniform(5000, float(max_amount)), 2)))
+            term = min(rng.choice(TERM_OPTIONS), max_tenure)
+            created_at = as_of - timedelta(seconds=rng.randint(30 * 86400, 730 * 86400))
+            status = rng.choice(("active", "closed", "pending", "rejected"))
+            disbursed_on = None
+            if status in ("active", "closed"):
+                disbursed_on = created_at + timedelta(days=rng.randint(1, 10))
+            if rng.random() < 0.5:
+                emit("collateral", lid, lid, rng.choice(("Property", "Vehicle", "Gold", "Deposits")),
+                     (principal * Decimal("1.5")).quantize(CENT), fake.sentence(), created_at.isoformat())
+            loan = [lid, b, type_id, principal, rate, term, disbursed_on, status, principal, created_at]
+            if disbursed_on:
+                disbursed.append(loan)
+            else:
+                emit("loans", *_iso(loan))
+
+    # Same EMI schedule approve_loan writes, for the whole shard at once
+    if disbursed:
+        schedule = amortization.amortize(
+            [l[3] for l in disbursed], [l[4] for l in disbursed], [l[5] for l in disbursed]
+        )
+        for k, loan in enumerate(disbursed):
+            loan[8], loan[7] = _repayments(emit, rng, as_of, loan, schedule, k)
+            emit("loans", *_iso(loan))
+    return {t: (out[t], counts[t]) for t in TABLES}
+
+
+def _iso(row):
+    return [v.isoformat() if isinstance(v, datetime) else v for v in row]
+
+
+def _repayments(emit, rng, as_of, loan, schedule, k):
+    """Emit one loan's repayments, receipts and ledger rows; returns (outstanding, status).
+
+    Balances follow pay_repayment: each payment comes off outstanding in
+    full, clamped at 0, and the loan closes when it reaches 0.
+    """
+    lid, _, _, principal, _, term, disbursed_on, status = loan[:8]
+    emit("ledger", ledger_id(lid, 0), lid, "disbursement", principal, disbursed_on.isoformat(), principal)
+    balance = principal
+    dues = amortization.due_dates(disbursed_on, term)
+    for (n, payment, _, _, _), due in zip(schedule.installments(k), dues):
+        paid_amount, paid_on, rp_status = Decimal("0.00"), None, "due"
+        if status == "closed" or (due < as_of and rng.random() < 0.9):
+            rp_status, paid_amount = "paid", payment
+            paid_on = min(due + timedelta(days=rng.randint(-2, 5)), as_of)
+        elif due < as_of:
+            rp_status = "overdue"
+        rid = repayment_id(lid, n)
+        emit("repayments", rid, lid, due.isoformat(), payment, paid_amount,
+             paid_on.isoformat() if paid_on else None, rp_status)
+        if paid_on:
+            balance = max(balance - paid_amount, Decimal("0.00"))
+            emit("receipts", rid, rid, f"REC-{rid}", paid_on.isoformat())
+            emit("ledger", ledger_id(lid, n), lid, "repayment", paid_amount, paid_on.isoformat(), balance)
+    return balance, ("closed" if balance == 0 else "active")
+
+
+# --- loading -----------------------------------------------------------------
+
+def load_shard(dsn, seed, shard, lo, hi, as_of_iso, loan_types):
+    started = time.perf_counter()
+    data = generate_shard(seed, shard, lo, hi, datetime.fromisoformat(as_of_iso), loan_types)
+    generated = time.perf_counter() - started
+    counts = {t: n for t, (_, n) in data.items()}
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cur:
+            # Test data: losing the last shards on a crash is fine, they rerun
+            cur.execute("SET LOCAL synchronous_commit = off")
+            for table, columns in TABLES.items():
+                buf, n = data[table]
+                if n:
+                    buf.seek(0)
+                    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.execute(
+                "INSERT INTO datagen_shards (shard, rows, seconds) VALUES (%s, %s, %s)",
+                (shard, sum(counts.values()), time.perf_counter() - started),
+            )
+    finally:
+        conn.close()
+    return shard, hi - lo, counts, generated, time.perf_counter() - started
+
+
+def _state(cur, key, default=None):
+    cur.execute("SELECT value FROM datagen_state WHERE key = %s", (key,))
+    row = cur.fetchone()
+    return row[0] if row else default
+
+
+def _set_state(cur, key, value):
+    cur.execute(
+        "INSERT INTO datagen_state (key, value) VALUES (%s, %s) "
+        "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
+        (key, json.dumps(value)),
+    )
+
+
+def _saved_ddl(cur):
+    """Secondary indexes and foreign keys on the generated tables.
+
+    Indexes on partitions are left out: they belong to the parent's index,
+    go with it when it is dropped and come back when it is recreated.
+    """
+    tables = list(TABLES)
+    cur.execute(
+        "SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid) "
+        "FROM pg_index i JOIN pg_class t ON t.oid = i.indrelid "
+        "WHERE t.relname = ANY(%s) AND NOT t.relispartition AND NOT i.indisunique "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+        (tables,),
+    )
+    indexes = [{"name": n, "ddl": d} for n, d in cur.fetchall()]
+    cur.execute(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND conparentid = 0 AND conrelid::regclass::text = ANY(%s)",
+        (tables,),
+    )
+    fks = [{"table": t, "name": n, "ddl": d} for t, n, d in cur.fetchall()]
+    return {"indexes": indexes, "fks": fks}
+
+
+def _drop_ddl(cur, ddl):
+    for fk in ddl["fks"]:
+        cur.execute(f'ALTER TABLE {fk["table"]} DROP CONSTRAINT IF EXISTS "{fk["name"]}"')
+    for ix in ddl["indexes"]:
+        cur.execute(f'DROP INDEX IF EXISTS {ix["name"]}')
+
+
+def _restore_ddl(cur, ddl, log=print):
+    for ix in ddl["indexes"]:
+        started = time.perf_counter()
+        # pg_get_indexdef gives "ON ONLY" for a partitioned table's index,
+        # which would build an invalid parent-only index; plain ON builds it
+        # on every partition too
+        sql = ix["ddl"].replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1).replace(" ON ONLY ", " ON ", 1)
+        cur.execute(sql)
+        log(f"  index {ix['name']}: {time.perf_counter() - started:.1f}s")
+    if ddl["indexes"]:
+        cur.execute(
+            "SELECT indexrelid::regclass::text FROM pg_index "
+            "WHERE indexrelid = ANY(%s::regclass[]) AND NOT indisvalid",
+            ([ix["name"] for ix in ddl["indexes"]],),
+        )
+        invalid = [name for (name,) in cur.fetchall()]
+        if invalid:
+            raise RuntimeError(f"Indexes left invalid after restore: {', '.join(invalid)}")
+    for fk in ddl["fks"]:
+        cur.execute("SELECT 1 FROM pg_constraint WHERE conname = %s AND conrelid = %s::regclass",
+                    (fk["name"], fk["table"]))
+        if cur.fetchone():
+            continue
+        started = time.perf_counter()
+        # Adding the constraint checks every row: this is the integrity check
+        cur.execute(f'ALTER TABLE {fk["table"]} ADD CONSTRAINT "{fk["name"]}" {fk["ddl"]}')
+        log(f"  foreign key {fk['name']}: {time.perf_counter() - started:.1f}s")
+
+
+def _reference_data(cur, password: str):
+    from app.auth import get_password_hash
+
+    cur.execute("SELECT count(*) FROM loan_types")
+    if not cur.fetchone()[0]:
+        cur.executemany(
+            "INSERT INTO loan_types (name, max_amount, max_tenure, base_interest_rate) VALUES (%s, %s, %s, %s)",
+            DEFAULT_LOAN_TYPES,
+        )
+    password_hash = get_password_hash(password)
+    for username, role in FIXED_USERS:
+        cur.execute(
+            "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s) "
+            "ON CONFLICT (username) DO NOTHING",
+            (username, password_hash, role),
+        )
+    cur.execute("SELECT id, max_amount, max_tenure, base_interest_rate FROM loan_types ORDER BY id")
+    return [(i, float(a), t, r) for i, a, t, r in cur.fetchall()]
+
+
+def _ensure_partitions(as_of: datetime):
+    # Generated ledger dates reach back ~25 months; give each its partition
+    # instead of piling everything into the default one.
+    with SessionLocal() as db:
+        if not partitions.is_partitioned(db, "ledger"):
+            return
+        first = partitions.add_months(partitions.month_start(as_of), -26)
+        existing = set(partitions.list_partitions(db, "ledger"))
+        month = first
+        while month <= partitions.month_start(as_of):
+            if month not in existing:
+                partitions.create_partition(db, "ledger", month)
+            month = partitions.add_months(month, 1)
+        db.commit()
+        partitions.ensure_partitions(db, today=as_of.date())
+
+
+def _fmt(n: float) -> str:
+    return f"{n / 1e6:.1f}M" if n >= 1e6 else f"{n / 1e3:.1f}k" if n >= 1e3 else f"{n:.0f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--borrowers", type=int, required=True, help="target number of borrowers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shard-size", type=int, default=5000, help="borrowers per shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None,
+                        help="reference 'now' for dates (default: today, fixed at the first run)")
+    parser.add_argument("--password", default="password123", help="password for the fixed users")
+    parser.add_argument("--reset", action="store_true", help="truncate generated tables and start over")
+    args = parser.parse_args(argv)
+
+    if loan_id(args.borrowers, MAX_LOANS - 1) * (MAX_TERM + 1) > INT4_MAX:
+        sys.exit(f"--borrowers {args.borrowers} overflows the integer id layout")
+
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE IF NOT EXISTS datagen_state (key text PRIMARY KEY, value jsonb NOT NULL)")
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS datagen_shards (shard integer PRIMARY KEY, rows bigint NOT NULL, "
+        "seconds double precision NOT NULL, finished_at timestamptz NOT NULL DEFAULT now())"
+    )
+
+    if args.reset:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        ddl = _state(cur, "ddl")
+        if ddl and not _state(cur, "finalized"):
+            _restore_ddl(cur, ddl, log=lambda _: None)
+        cur.execute("TRUNCATE datagen_state, datagen_shards")
+        print("Generated tables truncated")
+
+    as_of = args.as_of or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+    params = {"seed": args.seed, "borrowers": args.borrowers, "shard_size": args.shard_size,
+              "as_of": as_of.isoformat()}
+    saved = _state(cur, "params")
+    if saved is None:
+        _set_state(cur, "params", params)
+    else:
+        same = all(saved[k] == params[k] for k in ("seed", "borrowers", "shard_size"))
+        if not same or (args.as_of and saved["as_of"] != params["as_of"]):
+            sys.exit(f"A run with different parameters is in progress: {saved}. Rerun with the same "
+                     f"arguments to resume, or pass --reset.")
+        params = saved  # resuming keeps the original reference date
+    as_of = datetime.fromisoformat(params["as_of"])
+
+    if _state(cur, "ddl") is None:
+        loan_types = _reference_data(cur, args.password)
+        _ensure_partitions(as_of)
+        ddl = _saved_ddl(cur)
+        _drop_ddl(cur, ddl)
+        _set_state(cur, "ddl", ddl)
+        _set_state(cur, "loan_types", loan_types)
+        _set_state(cur, "finalized", False)
+        print(f"Dropped {len(ddl['indexes'])} indexes and {len(ddl['fks'])} foreign keys for the load")
+    loan_types = [tuple(t) for t in _state(cur, "loan_types")]
+
+    shards = [
+        (i, lo, min(lo + args.shard_size, args.borrowers + 1))
+        for i, lo in enumerate(range(1, args.borrowers + 1, args.shard_size))
+    ]
+    cur.execute("SELECT shard FROM datagen_shards")
+    done = {r[0] for r in cur.fetchall()}
+    todo = [s for s in shards if s[0] not in done]
+    print(f"{len(shards)} shards, {len(done)} already loaded, {len(todo)} to go "
+          f"(seed {args.seed}, as of {as_of.date()}, {args.workers} workers)")
+
+    started = time.perf_counter()
+    totals = dict.fromkeys(TABLES, 0)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(load_shard, DATABASE_URL, args.seed, i, lo, hi, as_of.isoformat(), loan_types)
+            for i, lo, hi in todo
+        ]
+        for finished, fut in enumerate(as_completed(futures), 1):
+            shard, borrowers, counts, generated, seconds = fut.result()
+            for t, n in counts.items():
+                totals[t] += n
+            rows = sum(totals.values())
+            elapsed = time.perf_counter() - started
+            rate = rows / elapsed if elapsed else 0
+            eta = (len(todo) - finished) * elapsed / finished
+            print(f"[{finished}/{len(todo)}] shard {shard}: {borrowers} borrowers, "
+                  f"{_fmt(sum(counts.values()))} rows in {seconds:.1f}s (generate {generated:.1f}s) | "
+                  f"total {_fmt(rows)} rows, {_fmt(rate)} rows/s, eta {eta:.0f}s", flush=True)
+
+    load_seconds = time.perf_counter() - started
+    if todo:
+        print("Loaded " + ", ".join(f"{t} {_fmt(n)}" for t, n in totals.items())
+              + f" in {load_seconds:.1f}s ({_fmt(sum(totals.values()) / load_seconds)} rows/s)")
+
+    if not _state(cur, "finalized"):
+        print("Rebuilding indexes and foreign keys")
+        started = time.perf_counter()
+        _restore_ddl(cur, _state(cur, "ddl"))
+        for table in TABLES:
+            cur.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST((SELECT max(id) FROM {table}), 1))"
+            )
+            cur.execute(f"ANALYZE {table}")
+        _set_state(cur, "finalized", True)
+        print(f"Finalized in {time.perf_counter() - started:.1f}s")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,15 @@
 import random
+import sys
 from datetime import datetime, timedelta
 from faker import Faker
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
-from app import models
+from app import models, amortization, portfolio
 
 # Initialize Faker
 fake = Faker()
 
-# Create Tables (Reset DB)
-print("Resetting database...")
-models.Base.metadata.drop_all(bind=engine)
-models.Base.metadata.create_all(bind=engine)
-
 def create_users(db: Session):
     print("--- Seeding Users ---")
     # 1. Fixed Users for Login
@@ -171,16 +168,17 @@ def process_loan_logic(db: Session, borrower_id: int, loan_types):
         generate_repayments(db, loan)
 
 def generate_repayments(db: Session, loan: models.Loan):
-    # Simple Interest Calculation for installment
-    total_interest = float(loan.principal) * (loan.interest_rate / 100) * (loan.term_months / 12)
-    total_payable = float(loan.principal) + total_interest
-    monthly_installment = round(total_payable / loan.term_months, 2)
+    # Same amortized EMI schedule approve_loan writes
+    schedule = amortization.amortize([loan.principal], [loan.interest_rate], [loan.term_months])
+    installments = [float(payment) for _, payment, _, _, _ in schedule.installments(0)]
+    total_payable = sum(installments)
     
     # Track how much is paid to update 'outstanding'
     total_paid = 0
     current_balance = float(loan.principal) # For ledger tracking
 
     for i in range(1, loan.term_months + 1):
+        monthly_installment = installments[i - 1]
         due_date = loan.disbursed_on + timedelta(days=30 * i)
         now = datetime.now()
         
@@ -251,13 +249,31 @@ def generate_repayments(db: Session, loan: models.Loan):
     current_outstanding = total_payable - total_paid
     loan.outstanding = max(0, current_outstanding)
 
+# Everything populate() fills. reference_versions is left alone: the
+# loan_types trigger bumps it when loan_types is truncated.
+DATA_TABLES = [
+    t.name for t in models.Base.metadata.sorted_tables if t.name != models.ReferenceVersion.__tablename__
+]
+
+def reset_data(db: Session):
+    # Empty the tables but keep the migrated schema (partitions, views,
+    # triggers), which drop_all/create_all would lose
+    if not inspect(engine).has_table("loans"):
+        sys.exit("Tables not found; run `alembic upgrade head` first.")
+    db.execute(text(f"TRUNCATE {', '.join(DATA_TABLES)} RESTART IDENTITY CASCADE"))
+    db.commit()
+
 def populate():
+    # Only when run as a script, never on import
+    print("Resetting database...")
     db = SessionLocal()
     try:
+        reset_data(db)
         create_users(db)
         create_loan_types(db)
         create_audit_logs(db)
         create_borrowers_and_loans(db)
+        portfolio.refresh(db)
         print("Database population completed successfully!")
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,23 @@
+import unittest
+from decimal import Decimal
+
+from app import amortization
+
+
+class AmortizeTests(unittest.TestCase):
+    def test_tiny_principal_at_zero_rate_has_no_negative_installment(self):
+        schedule = amortization.amortize([Decimal("0.05")], [0], [10])
+        self.assertTrue((schedule.payment[0] >= 0).all())
+        self.assertTrue((schedule.balance[0] >= 0).all())
+        self.assertEqual(int(schedule.payment[0].sum()), 5)
+
+    def test_schedule_repays_principal_exactly(self):
+        principals = [Decimal("0.01"), Decimal("0.07"), Decimal("250000.00"), Decimal("9999999999.99")]
+        schedule = amortization.amortize(principals, [0, 0.01, 10.7, 100], [7, 600, 36, 600])
+        for k, principal in enumerate(principals):
+            self.assertEqual(amortization.cents_to_decimal(schedule.principal[k].sum()), principal)
+            self.assertTrue((schedule.payment[k] >= 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
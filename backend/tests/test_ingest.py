@@ -0,0 +1,42 @@
+import unittest
+from decimal import Decimal
+
+from app import ingest
+
+
+def record(**fields):
+    raw = {"repayment_id": 1, "amount": "100.00", "paid_on": "2025-01-01"}
+    raw.update(fields)
+    return ingest.parse_record(raw)
+
+
+class ParseRecordTests(unittest.TestCase):
+    def test_valid_line(self):
+        rec = record(repayment_id="42", amount="12.50")
+        self.assertEqual(rec["repayment_id"], 42)
+        self.assertEqual(rec["amount"], Decimal("12.50"))
+
+    def test_huge_exponent_is_rejected(self):
+        for amount in ("1e400", "1E+999999"):
+            with self.assertRaises(ingest.LineError):
+                record(amount=amount)
+
+    def test_repayment_id_must_be_an_exact_integer(self):
+        for value in (1.7, 1.0, True, False, "1.7", "-1", "", None, [1]):
+            with self.assertRaises(ingest.LineError, msg=repr(value)):
+                record(repayment_id=value)
+
+    def test_amount_above_column_range_is_rejected(self):
+        self.assertEqual(record(amount="9999999999.99")["amount"], Decimal("9999999999.99"))
+        with self.assertRaises(ingest.LineError):
+            record(amount="10000000000.00")
+
+    def test_bad_lines_are_reported_not_raised(self):
+        parser = ingest.LineParser("ndjson")
+        _, rec, error = parser.feed(b'{"repayment_id": 1, "amount": "1e400", "paid_on": "2025-01-01"}')
+        self.assertIsNone(rec)
+        self.assertTrue(error)
+
+
+if __name__ == "__main__":
+    unittest.main()
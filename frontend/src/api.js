@@ -38,6 +38,18 @@ export async function fetchBorrowers() {
   if (!res.ok) throw await res.json();
   return res.json();
 }
+// params: { q, mode: "prefix" | "fuzzy", credit_min, credit_max, income_min, income_max, cursor, limit }
+// Resolves to { items, next_cursor }
+export async function searchBorrowers(params = {}) {
+  const query = new URLSearchParams(
+    Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== "")
+  );
+  const res = await fetch(`${API_BASE}/borrowers/search?${query}`, {
+    headers: { ...authHeaders() }
+  });
+  if (!res.ok) throw await res.json();
+  return res.json();
+}
 export async function createBorrower(payload) {
   const res = await fetch(`${API_BASE}/borrowers/`, {
     method: "POST",
@@ -49,10 +61,19 @@ export async function createBorrower(payload) {
 }
 
 /* Loans */
+// get_all_loans returns at most 500 loans per call; follow X-Next-Cursor
+// until the server stops sending it so every loan is listed
 export async function fetchLoans() {
-  const res = await fetch(`${API_BASE}/loans/get_all_loans`, { headers: { ...authHeaders() } });
-  if (!res.ok) throw await res.json();
-  return res.json();
+  const loans = [];
+  let cursor = null;
+  do {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const res = await fetch(`${API_BASE}/loans/get_all_loans${query}`, { headers: { ...authHeaders() } });
+    if (!res.ok) throw await res.json();
+    loans.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return loans;
 }
 export async function createLoan(payload) {
   const res = await fetch(`${API_BASE}/loans/`, {
@@ -37,7 +37,7 @@ export default function Repayments() {
             <option value="">-- select loan --</option>
             {loans.map(l => (
               <option key={l.id} value={l.id}>
-                {l.id} ({l.borrower ? l.borrower.name : `borrower ${l.borrower_id}`}) - {l.status}
+                {l.id} ({l.borrower_name || `borrower ${l.borrower_id}`}) - {l.status}
               </option>
             ))}
           </select>
@@ -51,14 +51,14 @@ export default function Repayments() {
             <thead><tr><th>#</th><th>Due date</th><th>Amount</th><th>Paid</th><th>Status</th><th>Action</th></tr></thead>
             <tbody>
               {repayments.map(rp => (
-                <tr key={rp.id}>
-                  <td>{rp.id}</td>
+                <tr key={rp.id ?? rp.due_date}>
+                  <td>{rp.id ?? "-"}</td>
                   <td>{new Date(rp.due_date).toLocaleDateString()}</td>
                   <td>{rp.amount}</td>
                   <td>{rp.paid_amount}</td>
                   <td>{rp.status}</td>
                   <td>
-                    {rp.status !== "paid" && <button className="btn primary" onClick={() => makePay(rp)}>Pay</button>}
+                    {rp.id != null && rp.status !== "paid" && <button className="btn primary" onClick={() => makePay(rp)}>Pay</button>}
                     {(rp.status === "paid" || rp.status === "partial") && (
                       <button
                         className="btn secondary"